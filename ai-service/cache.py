@@ -0,0 +1,90 @@
+"""
+Module de cache des réponses du service IA
+------------------------------------------
+Ce module fournit un cache en mémoire des réponses générées par le modèle,
+indexé sur les messages exacts envoyés à Ollama, afin de répondre sans
+nouvelle inférence aux requêtes répétées à l'identique.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+class ResponseCache:
+    """
+    Cache LRU à durée de vie limitée des réponses du modèle.
+
+    La clé est l'empreinte SHA-256 des messages sérialisés : seule une requête
+    strictement identique (prompt système, contexte et question) est servie
+    depuis le cache.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        """
+        Args:
+            max_size: Nombre maximal de réponses conservées
+            ttl: Durée de validité d'une réponse, en secondes
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(messages: List[Dict[str, str]]) -> str:
+        """
+        Calcule la clé de cache d'une liste de messages.
+
+        Args:
+            messages: Liste de messages formatés {"role": "...", "content": "..."}
+
+        Returns:
+            Empreinte hexadécimale des messages
+        """
+        return hashlib.sha256(orjson.dumps(messages)).hexdigest()
+
+    def get(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Renvoie la réponse en cache pour ces messages, si elle est encore valide.
+
+        Args:
+            messages: Liste de messages formatés {"role": "...", "content": "..."}
+
+        Returns:
+            Texte de la réponse, ou None en l'absence de réponse valide
+        """
+        key = self.make_key(messages)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        response_text, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return response_text
+
+    def set(self, messages: List[Dict[str, str]], response_text: str) -> None:
+        """
+        Enregistre la réponse générée pour ces messages.
+
+        Args:
+            messages: Liste de messages formatés {"role": "...", "content": "..."}
+            response_text: Texte de la réponse du modèle
+        """
+        key = self.make_key(messages)
+        self._entries[key] = (response_text, time.monotonic())
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -6,15 +6,34 @@ les données d'échéances afin d'améliorer les capacités prédictives.
 """
 
 import logging
+import sys
+from dataclasses import asdict, dataclass, fields
+from bisect import bisect_right
+from functools import lru_cache
 import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Union
-from pydantic import BaseModel
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple, Union
+from pydantic import BaseModel, ConfigDict, field_validator
 
 # Configuration du logging
 logger = logging.getLogger("data_processing")
 
+@dataclass(slots=True)
+class Features:
+    """Caractéristiques d'une échéance, calculées pour l'analyse"""
+    days_until_deadline: float
+    is_overdue: int
+    priority_value: int
+    status_progress: float
+    has_description: int
+    title_word_count: int
+    is_weekend_deadline: int
+    hour_of_deadline: int
+
+# Ordre des champs, partagé avec les colonnes de extract_features_batch
+_FEATURE_NAMES = tuple(field.name for field in fields(Features))
+
 # Modèles Pydantic pour la validation des données
 class DeadlineInfo(BaseModel):
     """Information sur une échéance"""
@@ -27,102 +46,304 @@ class DeadlineInfo(BaseModel):
     projectId: Optional[str] = None
     projectName: Optional[str] = None
     
-    class Config:
-        """Configuration pour la conversion datetime/json"""
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    # Pydantic v2 sérialise nativement les datetime en ISO 8601 (mode="json").
+    # Une échéance reçue n'est jamais modifiée : le modèle est figé (et hashable)
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
+    @field_validator("deadlineDate")
+    @classmethod
+    def _ensure_aware(cls, value: datetime) -> datetime:
+        """Interprète une date sans fuseau horaire comme une date UTC"""
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+# Tables de normalisation précalculées au chargement du module, indexées sur
+# la valeur complète en minuscules : toute autre valeur ("high", "en pause",
+# "cancelled"...) reçoit la valeur par défaut
+_PRIO_LUT = {"critique": 4, "haute": 3, "moyenne": 2, "basse": 1}
+
+_STATUS_LUT = {
+    "nouvelle": 0.0,
+    "en cours": 0.5,
+    "en attente": 0.3,
+    "complétée": 1.0,
+    "annulée": -1.0,
+}
+
+# Statuts considérés comme complétés dans les données historiques
+_COMPLETED_STATUSES = ("complétée", "terminée")
+
+# Paliers de temps restant (en jours) : retard, moins d'un jour, 1-3 jours,
+# 3-7 jours, plus d'une semaine. Le palier d'une échéance est donné par
+# days_bucket (ou np.searchsorted(..., side="right")) sur les seuils.
+_DAYS_THRESHOLDS = (0.0, 1.0, 3.0, 7.0)
+_BASE_PROBABILITIES = (0.1, 0.4, 0.6, 0.75, 0.85)
+
+_DAYS_BINS = np.array(_DAYS_THRESHOLDS)
+_BASE_PROB = np.array(_BASE_PROBABILITIES)
+
+# Bits du masque de risque (compute_risk_mask). Les trois premiers
+# correspondent aux trois premiers paliers de temps restant (1 << palier).
+_RISK_OVERDUE = 1 << 0
+_RISK_IMMINENT = 1 << 1
+_RISK_SHORT_DELAY = 1 << 2
+_RISK_STALLED_PRIORITY = 1 << 3
+_RISK_WEEKEND = 1 << 4
+_RISK_OFF_HOURS = 1 << 5
+_RISK_BAD_HISTORY = 1 << 6
+# Conditions qui ne sont pas des risques mais guident les recommandations
+_COND_LOW_PROGRESS = 1 << 7
+_COND_HIGH_PRIORITY = 1 << 8
+
+# Facteurs de risque (bit, facteur, impact, description), dans l'ordre de restitution.
+# Les descriptions sont des gabarits % : seules les valeurs numériques sont formatées.
+# Facteurs et impacts sont internés : les comparaisons en aval se réduisent à des
+# comparaisons d'identité
+_RISK_TABLE = tuple(
+    (bit, sys.intern(factor), sys.intern(impact), description)
+    for bit, factor, impact, description in (
+        (_RISK_OVERDUE, "Échéance dépassée", "critical",
+         "L'échéance est déjà dépassée de %(days)d jours."),
+        (_RISK_IMMINENT, "Délai imminent", "high",
+         "Moins de 24 heures avant l'échéance."),
+        (_RISK_SHORT_DELAY, "Délai court", "medium",
+         "Seulement %(days)d jours avant l'échéance."),
+        (_RISK_STALLED_PRIORITY, "Tâche haute priorité peu avancée", "high",
+         "Échéance de haute priorité avec peu de progrès."),
+        (_RISK_WEEKEND, "Échéance en weekend", "low",
+         "L'échéance tombe pendant un weekend, ce qui peut compliquer la finalisation."),
+        (_RISK_OFF_HOURS, "Échéance hors heures de bureau", "low",
+         "L'échéance est fixée en dehors des heures normales de travail."),
+        (_RISK_BAD_HISTORY, "Historique défavorable", "medium",
+         "Historiquement, %(rate)d%% des échéances similaires n'ont pas été complétées dans les délais."),
+    )
+)
+
+_RISK_BITS_BY_FACTOR = {factor: bit for bit, factor, _, _ in _RISK_TABLE}
+
+# Ajustements de probabilité, indexés par priority_value (1 à 4) et par
+# round(status_progress * 10) pour rester de simples lectures de tableau :
+# basse 0, moyenne 0.05, haute 0.1, critique 0.15 ; nouvelle 0, en attente 0.1,
+# en cours 0.3, complétée 0.5 (devrait être 1.0 mais gardons une marge)
+_PRIORITY_ADJUSTMENTS = (0, 0, 0.05, 0.1, 0.15)
+_STATUS_ADJUSTMENTS = (0, 0, 0, 0.1, 0, 0.3, 0, 0, 0, 0, 0.5)
+
+_PRIO_ADJ = np.array(_PRIORITY_ADJUSTMENTS, dtype=np.float64)
+_STATUS_ADJ = np.array(_STATUS_ADJUSTMENTS, dtype=np.float64)
+
+# Conversion multiplicative, une division empêchant la vectorisation de la boucle
+_MICROSECONDS_TO_DAYS = 1.0 / 86400e6
+
+# En dessous de ce nombre d'échéances, un Counter est plus rapide que pandas
+_PANDAS_MIN_BATCH = 256
+
+# Nombre minimal d'échéances historiques d'une priorité pour retenir son propre
+# taux de complétion plutôt que le taux global
+_MIN_PRIORITY_HISTORY = 5
 
 # Fonctions d'extraction et de transformation des caractéristiques
 
-def extract_deadline_features(deadline: DeadlineInfo) -> Dict[str, Any]:
+def days_bucket(days_left: float) -> int:
+    """
+    Renvoie le palier de temps restant d'une échéance.
+    
+    Args:
+        days_left: Jours restants avant l'échéance (négatif si elle est dépassée)
+        
+    Returns:
+        Indice du palier : 0 dépassée, 1 moins d'un jour, 2 de 1 à 3 jours,
+        3 de 3 à 7 jours, 4 plus d'une semaine
+    """
+    return bisect_right(_DAYS_THRESHOLDS, days_left)
+
+def extract_deadline_features(
+    deadline: DeadlineInfo,
+    now: Optional[datetime] = None
+) -> Features:
     """
     Extrait les caractéristiques importantes d'une échéance pour l'analyse.
     
     Args:
         deadline: L'échéance à analyser
+        now: Instant de référence (par défaut, l'heure courante)
         
     Returns:
-        Dictionnaire des caractéristiques extraites
+        Caractéristiques extraites
     """
-    now = datetime.now()
+    now = now or datetime.now(timezone.utc)
     deadline_date = deadline.deadlineDate
     
     # Calcul des caractéristiques temporelles
     days_until_deadline = (deadline_date - now).total_seconds() / (24 * 3600)
     is_overdue = days_until_deadline < 0
     
-    # Normalisation de la priorité
-    priority_map = {
-        "critique": 4,
-        "haute": 3,
-        "moyenne": 2,
-        "basse": 1
-    }
-    priority_value = priority_map.get(deadline.priority.lower(), 2)
-    
-    # Normalisation du statut
-    status_progress_map = {
-        "nouvelle": 0.0,
-        "en cours": 0.5,
-        "en attente": 0.3,
-        "complétée": 1.0,
-        "annulée": -1.0
-    }
-    status_progress = status_progress_map.get(deadline.status.lower(), 0.0)
+    # Normalisation de la priorité et du statut
+    priority_value = _PRIO_LUT.get(deadline.priority.lower(), 2)
+    status_progress = _STATUS_LUT.get(deadline.status.lower(), 0.0)
     
     # Extraction de caractéristiques textuelles basiques
     has_description = 1 if deadline.description and len(deadline.description) > 10 else 0
     title_word_count = len(deadline.title.split())
     
     # Construction du vecteur de caractéristiques
-    features = {
+    return Features(
+        days_until_deadline=days_until_deadline,
+        is_overdue=int(is_overdue),
+        priority_value=priority_value,
+        status_progress=status_progress,
+        has_description=has_description,
+        title_word_count=title_word_count,
+        is_weekend_deadline=1 if deadline_date.weekday() >= 5 else 0,
+        hour_of_deadline=deadline_date.hour,
+    )
+
+def _lookup_batch(keys: List[Any], lut: Dict[Any, Any], default: Any, dtype) -> np.ndarray:
+    """Applique une table de correspondance à un lot de clés, en un tableau typé"""
+    return np.fromiter((lut.get(key, default) for key in keys), dtype=dtype, count=len(keys))
+
+def _as_naive_utc(value: datetime, aware: bool) -> datetime:
+    """Ramène une date en UTC sans fuseau, NumPy ne représentant pas les fuseaux horaires"""
+    if (value.tzinfo is not None) != aware:
+        # Même erreur que la soustraction de extract_deadline_features
+        raise TypeError("can't subtract offset-naive and offset-aware datetimes")
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if aware else value
+
+def _days_until_batch(
+    deadlines: List[DeadlineInfo],
+    now: datetime
+) -> np.ndarray:
+    """Jours restants avant chaque échéance, à la microseconde, sans timedelta intermédiaire"""
+    aware = now.tzinfo is not None
+    dates = np.fromiter(
+        (_as_naive_utc(d.deadlineDate, aware) for d in deadlines),
+        dtype="datetime64[us]",
+        count=len(deadlines)
+    )
+    return (dates - np.datetime64(_as_naive_utc(now, aware), "us")).view("i8") * _MICROSECONDS_TO_DAYS
+
+def extract_features_batch(
+    deadlines: List[DeadlineInfo],
+    now: Optional[datetime] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Extrait les caractéristiques d'un lot d'échéances en une seule passe vectorisée.
+    
+    Produit les mêmes caractéristiques que extract_deadline_features, sous forme
+    de colonnes NumPy (une valeur par échéance) plutôt que d'un dictionnaire
+    par échéance.
+    
+    Args:
+        deadlines: Liste des échéances à analyser
+        now: Instant de référence (par défaut, l'heure courante)
+        
+    Returns:
+        Dictionnaire des colonnes de caractéristiques, dans l'ordre des échéances
+    """
+    now = now or datetime.now(timezone.utc)
+    days_until_deadline = _days_until_batch(deadlines, now)
+    priority_keys = [d.priority.lower() for d in deadlines]
+    status_keys = [d.status.lower() for d in deadlines]
+    
+    # Caractéristiques temporelles, lues comme extract_deadline_features sur
+    # l'heure locale de chaque échéance (dans son propre fuseau)
+    dates = np.fromiter(
+        (d.deadlineDate.replace(tzinfo=None) for d in deadlines),
+        dtype="datetime64[s]",
+        count=len(deadlines)
+    )
+    # Le 01/01/1970 était un jeudi (weekday() == 3)
+    weekday = (dates.astype("datetime64[D]").view("i8") + 3) % 7
+    hour_of_deadline = dates.astype("datetime64[h]").view("i8") % 24
+    
+    # Normalisation de la priorité et du statut par les mêmes tables que
+    # extract_deadline_features
+    priority_value = _lookup_batch(priority_keys, _PRIO_LUT, 2, np.int8)
+    status_progress = _lookup_batch(status_keys, _STATUS_LUT, 0.0, np.float64)
+    
+    # Caractéristiques textuelles basiques
+    has_description = np.array(
+        [1 if d.description and len(d.description) > 10 else 0 for d in deadlines],
+        dtype=np.int64
+    )
+    title_word_count = np.array([len(d.title.split()) for d in deadlines], dtype=np.int64)
+    
+    return {
         "days_until_deadline": days_until_deadline,
-        "is_overdue": int(is_overdue),
+        "is_overdue": (days_until_deadline < 0).astype(np.int64),
         "priority_value": priority_value,
         "status_progress": status_progress,
         "has_description": has_description,
         "title_word_count": title_word_count,
-        "is_weekend_deadline": 1 if deadline_date.weekday() >= 5 else 0,
-        "hour_of_deadline": deadline_date.hour,
+        "is_weekend_deadline": (weekday >= 5).astype(np.int64),
+        "hour_of_deadline": hour_of_deadline,
     }
-    
-    return features
 
-def enrich_deadlines_with_features(deadlines: List[DeadlineInfo]) -> List[Dict[str, Any]]:
+def _feature_records(features: Dict[str, np.ndarray]) -> List[Features]:
+    """Convertit les colonnes de extract_features_batch en un objet Features par échéance"""
+    columns = [features[name].tolist() for name in _FEATURE_NAMES]
+    return [Features(*row) for row in zip(*columns)]
+
+def enrich_deadlines_with_features(
+    deadlines: List[DeadlineInfo],
+    now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
     """
     Enrichit une liste d'échéances avec des caractéristiques calculées.
     
     Args:
         deadlines: Liste des échéances à enrichir
+        now: Instant de référence (par défaut, l'heure courante)
         
     Returns:
         Liste des échéances avec caractéristiques enrichies
     """
+    if not deadlines:
+        return []
+    
+    # Calculer les caractéristiques de tout le lot en une fois
+    features_batch = _feature_records(extract_features_batch(deadlines, now))
+    
     enriched_deadlines = []
     
-    for deadline in deadlines:
-        # Extraire les données de base
-        deadline_dict = deadline.dict()
+    for deadline, features in zip(deadlines, features_batch):
+        # Extraire les données de base (copie superficielle, les champs étant scalaires)
+        deadline_dict = deadline.__dict__.copy()
         
         # Ajouter les caractéristiques calculées
-        features = extract_deadline_features(deadline)
-        deadline_dict["features"] = features
+        deadline_dict["features"] = asdict(features)
         
         # Ajouter quelques métadonnées supplémentaires
-        deadline_dict["days_left"] = features["days_until_deadline"]
-        deadline_dict["completion_status"] = features["status_progress"] * 100
+        deadline_dict["days_left"] = features.days_until_deadline
+        deadline_dict["completion_status"] = features.status_progress * 100
         
         enriched_deadlines.append(deadline_dict)
     
     return enriched_deadlines
 
-def compute_deadline_stats(deadlines: List[DeadlineInfo]) -> Dict[str, Any]:
+def _distribution(values: List[str]) -> Dict[str, float]:
+    """Répartition en pourcentage des valeurs (insensible à la casse)"""
+    total = len(values)
+    
+    # pandas n'est chargé que pour les gros lots, où value_counts devient rentable
+    if total > _PANDAS_MIN_BATCH:
+        import pandas as pd
+        counts = pd.Series(values).str.lower().value_counts(sort=False)
+        return (counts / total * 100).to_dict()
+    
+    counts = Counter(value.lower() for value in values)
+    return {k: (v / total) * 100 for k, v in counts.items()}
+
+def compute_deadline_stats(
+    deadlines: List[DeadlineInfo],
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
     """
     Calcule des statistiques sur un ensemble d'échéances.
     
     Args:
         deadlines: Liste des échéances
+        now: Instant de référence (par défaut, l'heure courante)
         
     Returns:
         Dictionnaire de statistiques sur les échéances
@@ -137,31 +358,20 @@ def compute_deadline_stats(deadlines: List[DeadlineInfo]) -> Dict[str, Any]:
             "status_distribution": {}
         }
     
-    now = datetime.now()
+    # Seuls les jours restants sont nécessaires : inutile d'extraire toutes
+    # les caractéristiques du lot
+    days_left = _days_until_batch(deadlines, now or datetime.now(timezone.utc))
     
     # Calcul des statistiques de base
-    total = len(deadlines)
-    overdue = sum(1 for d in deadlines if d.deadlineDate < now)
-    overdue_percentage = (overdue / total) * 100 if total > 0 else 0
-    
-    days_left = [(d.deadlineDate - now).total_seconds() / (24 * 3600) for d in deadlines]
-    avg_days_left = sum(days_left) / total if total > 0 else 0
-    
-    # Distribution des priorités
-    priorities = [d.priority.lower() for d in deadlines]
-    priority_counts = {}
-    for p in priorities:
-        priority_counts[p] = priority_counts.get(p, 0) + 1
+    total = days_left.size
+    overdue = int((days_left < 0).sum())
+    overdue_percentage = (overdue / total) * 100
     
-    priority_distribution = {k: (v / total) * 100 for k, v in priority_counts.items()}
+    avg_days_left = float(days_left.mean())
     
-    # Distribution des statuts
-    statuses = [d.status.lower() for d in deadlines]
-    status_counts = {}
-    for s in statuses:
-        status_counts[s] = status_counts.get(s, 0) + 1
-    
-    status_distribution = {k: (v / total) * 100 for k, v in status_counts.items()}
+    # Distributions des priorités et des statuts
+    priority_distribution = _distribution([d.priority for d in deadlines])
+    status_distribution = _distribution([d.status for d in deadlines])
     
     return {
         "count": total,
@@ -172,9 +382,77 @@ def compute_deadline_stats(deadlines: List[DeadlineInfo]) -> Dict[str, Any]:
         "status_distribution": status_distribution
     }
 
+def _completion_rates(historical_data: List[DeadlineInfo]) -> Tuple[float, float, np.ndarray]:
+    """
+    Calcule les taux de complétion global et par priorité, et le taux d'échec, de l'historique.
+    
+    Args:
+        historical_data: Données historiques (non vides)
+        
+    Returns:
+        Taux global, taux d'échec, et tableau des taux indexé par priority_value :
+        une priorité trop peu représentée reprend le taux global
+    """
+    statuses = np.array([d.status.lower() for d in historical_data])
+    completed = np.isin(statuses, _COMPLETED_STATUSES)
+    priorities = np.fromiter(
+        (_PRIO_LUT.get(d.priority.lower(), 2) for d in historical_data),
+        dtype=np.intp,
+        count=len(historical_data)
+    )
+    completion_rate = float(completed.mean())
+    # Calculé comme manquées / total, et non 1 - completion_rate, dont l'arrondi
+    # peut faire perdre un point au pourcentage affiché
+    miss_rate = float((~completed).mean())
+    
+    # Effectifs et complétions par priorité en une passe chacun
+    counts = np.bincount(priorities, minlength=len(_PRIO_ADJ))
+    completed_counts = np.bincount(priorities, weights=completed, minlength=len(_PRIO_ADJ))
+    
+    by_priority = np.full(len(_PRIO_ADJ), completion_rate)
+    enough = counts >= _MIN_PRIORITY_HISTORY
+    by_priority[enough] = completed_counts[enough] / counts[enough]
+    
+    return completion_rate, miss_rate, by_priority
+
+def summarize_history(
+    historical_data: Optional[List[DeadlineInfo]],
+    now: Optional[datetime] = None,
+    with_stats: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Résume une fois pour toutes les données historiques utilisées par l'analyse.
+    
+    Le résumé peut être partagé entre toutes les échéances analysées avec le
+    même historique, ce qui évite de reparcourir ce dernier pour chacune.
+    
+    Args:
+        historical_data: Données historiques à résumer
+        now: Instant de référence (par défaut, l'heure courante)
+        with_stats: Inclure les statistiques détaillées de compute_deadline_stats
+        
+    Returns:
+        Dictionnaire du résumé, ou None en l'absence d'historique
+    """
+    if not historical_data:
+        return None
+    
+    completion_rate, miss_rate, completion_rate_by_priority = _completion_rates(historical_data)
+    
+    return {
+        "count": len(historical_data),
+        "completion_rate": completion_rate,
+        "completion_rate_by_priority": completion_rate_by_priority,
+        "miss_rate": miss_rate,
+        "stats": compute_deadline_stats(historical_data, now) if with_stats else None
+    }
+
 def estimate_completion_probability(
     deadline: DeadlineInfo, 
-    historical_data: Optional[List[DeadlineInfo]] = None
+    historical_data: Optional[List[DeadlineInfo]] = None,
+    now: Optional[datetime] = None,
+    features: Optional[Features] = None,
+    history_summary: Optional[Dict[str, Any]] = None
 ) -> float:
     """
     Estime la probabilité de complétion d'une échéance dans les délais
@@ -186,57 +464,40 @@ def estimate_completion_probability(
     Args:
         deadline: L'échéance à évaluer
         historical_data: Données historiques pour comparaison
+        now: Instant de référence (par défaut, l'heure courante)
+        features: Caractéristiques déjà extraites de l'échéance, le cas échéant
+        history_summary: Résumé de l'historique issu de summarize_history, le cas échéant
         
     Returns:
         Probabilité de complétion entre 0 et 1
     """
-    # Extraction des caractéristiques
-    features = extract_deadline_features(deadline)
-    
-    # Base de probabilité selon le temps restant
-    days_left = features["days_until_deadline"]
-    
-    if days_left < 0:  # Déjà en retard
-        base_probability = 0.1  # Faible chance mais pas impossible
-    elif days_left < 1:  # Moins d'un jour
-        base_probability = 0.4
-    elif days_left < 3:  # 1-3 jours
-        base_probability = 0.6
-    elif days_left < 7:  # 3-7 jours
-        base_probability = 0.75
-    else:  # Plus d'une semaine
-        base_probability = 0.85
-    
-    # Ajustement selon la priorité
-    priority_adjustment = {
-        1: 0,      # basse
-        2: 0.05,   # moyenne
-        3: 0.1,    # haute
-        4: 0.15    # critique
-    }
+    # Extraction des caractéristiques, sauf si elles sont fournies
+    if features is None:
+        features = extract_deadline_features(deadline, now)
     
-    # Ajustement selon le progrès du statut
-    status_adjustment = {
-        0.0: 0,     # nouvelle
-        0.3: 0.1,   # en attente
-        0.5: 0.3,   # en cours
-        1.0: 0.5    # complétée (devrait être 1.0 mais gardons une marge)
-    }
+    # Base de probabilité selon le palier de temps restant
+    days_left = features.days_until_deadline
+    base_probability = _BASE_PROBABILITIES[days_bucket(days_left)]
     
-    # Appliquer les ajustements
+    # Appliquer les ajustements selon la priorité et le progrès du statut
+    # (un statut annulé, à -1.0, ne reçoit aucun ajustement)
     probability = base_probability
-    probability += priority_adjustment.get(features["priority_value"], 0)
-    probability += status_adjustment.get(features["status_progress"], 0)
+    probability += _PRIORITY_ADJUSTMENTS[features.priority_value]
+    probability += _STATUS_ADJUSTMENTS[max(0, round(features.status_progress * 10))]
     
     # Ajustement pour les échéances le weekend
-    if features["is_weekend_deadline"]:
+    if features.is_weekend_deadline:
         probability -= 0.05
     
     # Si nous avons des données historiques, ajustons en fonction des tendances
-    if historical_data and len(historical_data) > 0:
-        # Calculer le taux de complétion historique
-        completed = sum(1 for d in historical_data if d.status.lower() in ["complétée", "terminée"])
-        historical_rate = completed / len(historical_data)
+    if history_summary is None:
+        history_summary = summarize_history(historical_data, now, with_stats=False)
+    
+    if history_summary:
+        # Taux des échéances historiques de même priorité, si assez nombreuses
+        historical_rate = float(
+            history_summary["completion_rate_by_priority"][features.priority_value]
+        )
         
         # Ajuster la probabilité en tenant compte de l'historique (poids: 30%)
         probability = 0.7 * probability + 0.3 * historical_rate
@@ -246,9 +507,182 @@ def estimate_completion_probability(
     
     return probability
 
+def _probability_kernel(days_until, priority_value, status_progress, is_weekend):
+    """Noyau NumPy de estimate_completion_probability_batch, utilisé sans Numba"""
+    # Base de probabilité selon le palier de temps restant, sans branchement
+    base = _BASE_PROB[np.searchsorted(_DAYS_BINS, days_until, side="right")]
+    
+    status_index = np.clip(np.rint(status_progress * 10), 0, 10).astype(np.int64)
+    
+    return base + _PRIO_ADJ[priority_value] + _STATUS_ADJ[status_index] - 0.05 * is_weekend
+
+def _probability_element(days_until, priority_value, status_progress, is_weekend, out):
+    """
+    Corps scalaire du noyau de probabilité, étendu aux tableaux par guvectorize.
+    
+    Ne manipule que des nombres et des tableaux constants, afin que Numba
+    compile la boucle sans aucun objet Python.
+    """
+    # Palier de temps restant, équivalent à searchsorted(side="right")
+    tier = 0
+    for threshold in _DAYS_BINS:
+        if days_until >= threshold:
+            tier += 1
+    
+    status_index = min(max(int(np.rint(status_progress * 10.0)), 0), 10)
+    
+    probability = _BASE_PROB[tier] + _PRIO_ADJ[priority_value] + _STATUS_ADJ[status_index]
+    if is_weekend:
+        probability -= 0.05
+    out[0] = probability
+
+@lru_cache(maxsize=None)
+def _get_probability_ufunc():
+    """
+    Construit au premier appel le noyau de probabilité compilé par Numba.
+    
+    Numba est optionnel et n'est importé qu'ici, au premier calcul par lot :
+    le chargement du module reste rapide pour les processus qui ne s'en
+    servent pas.
+    
+    Returns:
+        La ufunc compilée, ou None si Numba n'est pas installé (le calcul
+        s'exécute alors en NumPy pur)
+    """
+    try:
+        from numba import guvectorize
+    except ImportError:
+        return None
+    
+    return guvectorize(
+        ["void(float64, int8, float64, boolean, float64[:])"],
+        "(),(),(),()->()",
+        target="parallel",
+        cache=True
+    )(_probability_element)
+
+def estimate_completion_probability_batch(
+    features: Dict[str, np.ndarray],
+    history_summary: Optional[Dict[str, Any]] = None
+) -> np.ndarray:
+    """
+    Estime la probabilité de complétion de tout un lot d'échéances.
+    
+    Applique le même modèle heuristique que estimate_completion_probability
+    aux colonnes produites par extract_features_batch.
+    
+    Args:
+        features: Caractéristiques du lot, issues de extract_features_batch
+        history_summary: Résumé de l'historique issu de summarize_history, le cas échéant
+        
+    Returns:
+        Tableau des probabilités de complétion entre 0 et 1
+    """
+    probability_ufunc = _get_probability_ufunc()
+    if probability_ufunc is not None:
+        # Noyau compilé par Numba, réparti sur plusieurs threads
+        probability = probability_ufunc(
+            features["days_until_deadline"].astype(np.float64, copy=False),
+            features["priority_value"].astype(np.int8, copy=False),
+            features["status_progress"].astype(np.float64, copy=False),
+            features["is_weekend_deadline"].astype(np.bool_)
+        )
+    else:
+        probability = _probability_kernel(
+            features["days_until_deadline"],
+            features["priority_value"],
+            features["status_progress"],
+            features["is_weekend_deadline"].astype(np.float64)
+        )
+    
+    # Ajuster la probabilité en tenant compte de l'historique (poids: 30%),
+    # en place pour ne pas allouer de tableaux intermédiaires
+    if history_summary:
+        probability *= 0.7
+        probability += 0.3 * history_summary["completion_rate_by_priority"][features["priority_value"]]
+    
+    return np.clip(probability, 0, 1, out=probability)
+
+def compute_risk_mask(
+    features: Features,
+    history_summary: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Évalue une seule fois les conditions de risque d'une échéance.
+    
+    Chaque bit du masque correspond à une condition ; analyze_deadline_risks et
+    generate_deadline_recommendations consomment ce même masque.
+    
+    Args:
+        features: Caractéristiques de l'échéance
+        history_summary: Résumé de l'historique issu de summarize_history, le cas échéant
+        
+    Returns:
+        Masque de bits des conditions vérifiées
+    """
+    priority_value = features.priority_value
+    status_progress = features.status_progress
+    hour = features.hour_of_deadline
+    
+    mask = 0
+    
+    time_tier = days_bucket(features.days_until_deadline)
+    if time_tier < 3:
+        mask |= 1 << time_tier
+    if priority_value >= 3 and status_progress < 0.5:
+        mask |= _RISK_STALLED_PRIORITY
+    if features.is_weekend_deadline:
+        mask |= _RISK_WEEKEND
+    if hour < 9 or hour > 17:
+        mask |= _RISK_OFF_HOURS
+    if history_summary and history_summary["count"] >= 3 and history_summary["miss_rate"] > 0.5:
+        mask |= _RISK_BAD_HISTORY
+    if status_progress < 0.3:
+        mask |= _COND_LOW_PROGRESS
+    if priority_value >= 3:
+        mask |= _COND_HIGH_PRIORITY
+    
+    return mask
+
+def compute_risk_mask_batch(
+    features: Dict[str, np.ndarray],
+    history_summary: Optional[Dict[str, Any]] = None
+) -> np.ndarray:
+    """
+    Équivalent vectorisé de compute_risk_mask pour les colonnes de extract_features_batch.
+    
+    Args:
+        features: Caractéristiques du lot, issues de extract_features_batch
+        history_summary: Résumé de l'historique issu de summarize_history, le cas échéant
+        
+    Returns:
+        Tableau uint16 des masques, un par échéance
+    """
+    priority_value = features["priority_value"]
+    status_progress = features["status_progress"]
+    hour = features["hour_of_deadline"]
+    
+    time_tier = np.searchsorted(_DAYS_BINS, features["days_until_deadline"], side="right")
+    mask = np.where(time_tier < 3, np.left_shift(1, time_tier), 0).astype(np.uint16)
+    
+    mask |= ((priority_value >= 3) & (status_progress < 0.5)) * np.uint16(_RISK_STALLED_PRIORITY)
+    mask |= (features["is_weekend_deadline"] != 0) * np.uint16(_RISK_WEEKEND)
+    mask |= ((hour < 9) | (hour > 17)) * np.uint16(_RISK_OFF_HOURS)
+    mask |= (status_progress < 0.3) * np.uint16(_COND_LOW_PROGRESS)
+    mask |= (priority_value >= 3) * np.uint16(_COND_HIGH_PRIORITY)
+    
+    if history_summary and history_summary["count"] >= 3 and history_summary["miss_rate"] > 0.5:
+        mask |= np.uint16(_RISK_BAD_HISTORY)
+    
+    return mask
+
 def analyze_deadline_risks(
     deadline: DeadlineInfo, 
-    historical_data: Optional[List[DeadlineInfo]] = None
+    historical_data: Optional[List[DeadlineInfo]] = None,
+    now: Optional[datetime] = None,
+    features: Optional[Features] = None,
+    history_summary: Optional[Dict[str, Any]] = None,
+    risk_mask: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
     Analyse les risques associés à une échéance.
@@ -256,75 +690,88 @@ def analyze_deadline_risks(
     Args:
         deadline: L'échéance à analyser
         historical_data: Données historiques pour comparaison
+        now: Instant de référence (par défaut, l'heure courante)
+        features: Caractéristiques déjà extraites de l'échéance, le cas échéant
+        history_summary: Résumé de l'historique issu de summarize_history, le cas échéant
+        risk_mask: Masque issu de compute_risk_mask, le cas échéant
         
     Returns:
         Liste des facteurs de risque identifiés
     """
-    features = extract_deadline_features(deadline)
-    risks = []
-    
-    # Risque lié au temps
-    days_left = features["days_until_deadline"]
-    if days_left < 0:
-        risks.append({
-            "factor": "Échéance dépassée",
-            "impact": "critical",
-            "description": f"L'échéance est déjà dépassée de {abs(int(days_left))} jours."
-        })
-    elif days_left < 1:
-        risks.append({
-            "factor": "Délai imminent",
-            "impact": "high",
-            "description": "Moins de 24 heures avant l'échéance."
-        })
-    elif days_left < 3:
-        risks.append({
-            "factor": "Délai court",
-            "impact": "medium",
-            "description": f"Seulement {int(days_left)} jours avant l'échéance."
-        })
-    
-    # Risque lié à la priorité et au statut
-    if features["priority_value"] >= 3 and features["status_progress"] < 0.5:
-        risks.append({
-            "factor": "Tâche haute priorité peu avancée",
-            "impact": "high",
-            "description": "Échéance de haute priorité avec peu de progrès."
-        })
-    
-    # Risque lié au jour de la semaine
-    if features["is_weekend_deadline"]:
-        risks.append({
-            "factor": "Échéance en weekend",
-            "impact": "low",
-            "description": "L'échéance tombe pendant un weekend, ce qui peut compliquer la finalisation."
-        })
-    
-    # Risque lié à l'heure
-    if features["hour_of_deadline"] < 9 or features["hour_of_deadline"] > 17:
-        risks.append({
-            "factor": "Échéance hors heures de bureau",
-            "impact": "low",
-            "description": "L'échéance est fixée en dehors des heures normales de travail."
-        })
-    
-    # Risques basés sur l'historique
-    if historical_data and len(historical_data) >= 3:
-        similar_missed = [d for d in historical_data if d.status.lower() not in ["complétée", "terminée"]]
-        missed_rate = len(similar_missed) / len(historical_data)
-        
-        if missed_rate > 0.5:
-            risks.append({
-                "factor": "Historique défavorable",
-                "impact": "medium",
-                "description": f"Historiquement, {int(missed_rate*100)}% des échéances similaires n'ont pas été complétées dans les délais."
-            })
+    if features is None:
+        features = extract_deadline_features(deadline, now)
+    if history_summary is None:
+        history_summary = summarize_history(historical_data, now, with_stats=False)
+    
+    if risk_mask is None:
+        risk_mask = compute_risk_mask(features, history_summary)
+    
+    # Valeurs numériques reprises dans les descriptions
+    values = {
+        "days": abs(int(features.days_until_deadline)),
+        "rate": int(history_summary["miss_rate"] * 100) if history_summary else 0
+    }
+    
+    risks = [
+        {
+            "factor": factor,
+            "impact": impact,
+            "description": description % values
+        }
+        for bit, factor, impact, description in _RISK_TABLE
+        if risk_mask & bit
+    ]
     
     return risks
 
+# Nombre maximal de recommandations, pour éviter la surcharge
+_MAX_RECOMMENDATIONS = 5
+
+# Recommandations (bit du masque de risque, textes), dans l'ordre d'application
+_RECO_TABLE = (
+    # Temps restant
+    (_RISK_OVERDUE,
+     ("Redéfinir l'échéance avec une nouvelle date réaliste",
+      "Communiquer immédiatement avec les parties prenantes concernant le retard")),
+    (_RISK_IMMINENT,
+     ("Concentrer tous les efforts sur cette tâche en priorité",
+      "Éliminer toutes les distractions et réunions non essentielles")),
+    (_RISK_SHORT_DELAY,
+     ("Allouer un bloc de temps dédié chaque jour à cette tâche",
+      "Identifier et résoudre rapidement les blocages potentiels")),
+    # Statut peu avancé
+    (_COND_LOW_PROGRESS,
+     ("Décomposer l'échéance en sous-tâches plus petites et gérables",
+      "Définir des jalons intermédiaires pour suivre la progression")),
+    # Priorité haute ou critique
+    (_COND_HIGH_PRIORITY,
+     ("Envisager de déléguer d'autres tâches moins prioritaires",
+      "Solliciter des ressources supplémentaires si nécessaire")),
+    # Facteurs de risque identifiés
+    (_RISK_STALLED_PRIORITY,
+     ("Organiser une session de travail intensif (type 'sprint') sur cette tâche",)),
+    (_RISK_WEEKEND,
+     ("Planifier l'achèvement pour le vendredi précédent",)),
+    (_RISK_BAD_HISTORY,
+     ("Analyser les causes d'échecs précédents pour éviter les mêmes erreurs",)),
+)
+
+# Bits lus directement sur les caractéristiques ; les autres viennent des risques fournis
+_RECO_FEATURE_BITS = _RISK_OVERDUE | _RISK_IMMINENT | _RISK_SHORT_DELAY | _COND_LOW_PROGRESS | _COND_HIGH_PRIORITY
+
+# Recommandations générales si la liste est encore courte
+_GENERAL_RECOMMENDATIONS = (
+    "Mettre en place des points de contrôle réguliers pour suivre l'avancement",
+    "Documenter les progrès et les obstacles rencontrés",
+    "Maintenir une communication claire avec toutes les parties prenantes",
+)
+
 def generate_deadline_recommendations(
     deadline: DeadlineInfo,
-    risks: List[Dict[str, Any]]
+    risks: List[Dict[str, Any]],
+    now: Optional[datetime] = None,
+    features: Optional[Features] = None,
+    risk_mask: Optional[int] = None
 ) -> List[str]:
     """
     Génère des recommandations pour améliorer les chances de complétion d'une échéance.
@@ -332,57 +779,46 @@ def generate_deadline_recommendations(
     Args:
         deadline: L'échéance concernée
         risks: Liste des risques identifiés
+        now: Instant de référence (par défaut, l'heure courante)
+        features: Caractéristiques déjà extraites de l'échéance, le cas échéant
+        risk_mask: Masque issu de compute_risk_mask, ayant servi à produire risks
         
     Returns:
         Liste de recommandations
     """
-    features = extract_deadline_features(deadline)
+    if features is None:
+        features = extract_deadline_features(deadline, now)
+    if risk_mask is None:
+        # Conditions des caractéristiques, complétées par les risques fournis
+        risk_mask = compute_risk_mask(features) & _RECO_FEATURE_BITS
+        for risk in risks:
+            risk_mask |= _RISK_BITS_BY_FACTOR.get(risk["factor"], 0)
+    
     recommendations = []
     
-    # Recommandations basées sur le temps restant
-    days_left = features["days_until_deadline"]
-    if days_left < 0:
-        recommendations.append("Redéfinir l'échéance avec une nouvelle date réaliste")
-        recommendations.append("Communiquer immédiatement avec les parties prenantes concernant le retard")
-    elif days_left < 1:
-        recommendations.append("Concentrer tous les efforts sur cette tâche en priorité")
-        recommendations.append("Éliminer toutes les distractions et réunions non essentielles")
-    elif days_left < 3:
-        recommendations.append("Allouer un bloc de temps dédié chaque jour à cette tâche")
-        recommendations.append("Identifier et résoudre rapidement les blocages potentiels")
-    
-    # Recommandations basées sur le statut
-    if features["status_progress"] < 0.3:
-        recommendations.append("Décomposer l'échéance en sous-tâches plus petites et gérables")
-        recommendations.append("Définir des jalons intermédiaires pour suivre la progression")
-    
-    # Recommandations basées sur la priorité
-    if features["priority_value"] >= 3:
-        recommendations.append("Envisager de déléguer d'autres tâches moins prioritaires")
-        recommendations.append("Solliciter des ressources supplémentaires si nécessaire")
-    
-    # Recommandations basées sur les risques identifiés
-    for risk in risks:
-        if risk["factor"] == "Échéance en weekend":
-            recommendations.append("Planifier l'achèvement pour le vendredi précédent")
-        elif risk["factor"] == "Historique défavorable":
-            recommendations.append("Analyser les causes d'échecs précédents pour éviter les mêmes erreurs")
-        elif risk["factor"] == "Tâche haute priorité peu avancée":
-            recommendations.append("Organiser une session de travail intensif (type 'sprint') sur cette tâche")
+    # Recommandations selon les conditions vérifiées, jusqu'à atteindre la limite
+    for bit, texts in _RECO_TABLE:
+        if len(recommendations) >= _MAX_RECOMMENDATIONS:
+            break
+        if risk_mask & bit:
+            recommendations.extend(texts)
     
     # Recommandations générales si la liste est encore courte
     if len(recommendations) < 3:
-        recommendations.append("Mettre en place des points de contrôle réguliers pour suivre l'avancement")
-        recommendations.append("Documenter les progrès et les obstacles rencontrés")
-        recommendations.append("Maintenir une communication claire avec toutes les parties prenantes")
+        recommendations.extend(_GENERAL_RECOMMENDATIONS)
     
-    return recommendations[:5]  # Limiter à 5 recommandations pour éviter la surcharge
+    return recommendations[:_MAX_RECOMMENDATIONS]
 
 # Fonction principale d'analyse complète
 
 def analyze_deadline(
     deadline: DeadlineInfo, 
-    historical_data: Optional[List[DeadlineInfo]] = None
+    historical_data: Optional[List[DeadlineInfo]] = None,
+    now: Optional[datetime] = None,
+    history_summary: Optional[Dict[str, Any]] = None,
+    features: Optional[Features] = None,
+    probability: Optional[float] = None,
+    risk_mask: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Réalise une analyse complète d'une échéance.
@@ -390,54 +826,123 @@ def analyze_deadline(
     Args:
         deadline: L'échéance à analyser
         historical_data: Données historiques pour comparaison
+        now: Instant de référence (par défaut, l'heure courante)
+        history_summary: Résumé de l'historique issu de summarize_history, le cas échéant
+        features: Caractéristiques déjà extraites de l'échéance, le cas échéant
+        probability: Probabilité de complétion déjà estimée, le cas échéant
+        risk_mask: Masque issu de compute_risk_mask, le cas échéant
         
     Returns:
         Résultats d'analyse complets
     """
+    # Un seul instant de référence pour toute l'analyse
+    now = now or datetime.now(timezone.utc)
+    
+    # Les champs de l'échéance étant scalaires, une copie superficielle suffit
+    # et évite la sérialisation complète de .dict()
+    deadline_info = deadline.__dict__.copy()
+    
+    # Seuls les calculs numériques (dates, historique) peuvent échouer : les
+    # risques et recommandations ne sont ensuite que des lectures de tables
     try:
+        # Résumer l'historique une seule fois pour tous les calculs
+        if history_summary is None:
+            history_summary = summarize_history(historical_data, now)
+        
         # Extraire les caractéristiques
-        features = extract_deadline_features(deadline)
+        if features is None:
+            features = extract_deadline_features(deadline, now)
         
         # Estimer la probabilité de complétion
-        probability = estimate_completion_probability(deadline, historical_data)
-        
-        # Analyser les risques
-        risks = analyze_deadline_risks(deadline, historical_data)
-        
-        # Générer des recommandations
-        recommendations = generate_deadline_recommendations(deadline, risks)
-        
-        # Calculer des statistiques sur les données historiques, si disponibles
-        historical_stats = compute_deadline_stats(historical_data) if historical_data else None
-        
-        # Assembler les résultats
-        results = {
-            "deadline_info": deadline.dict(),
-            "features": features,
-            "completion_probability": probability,
-            "risk_factors": risks,
-            "recommendations": recommendations
-        }
-        
-        if historical_stats:
-            results["historical_stats"] = historical_stats
+        if probability is None:
+            probability = estimate_completion_probability(
+                deadline, historical_data, now, features, history_summary
+            )
         
-        return results
+        # Évaluer une seule fois les conditions de risque
+        if risk_mask is None:
+            risk_mask = compute_risk_mask(features, history_summary)
     
     except Exception as e:
-        logger.error(f"Erreur lors de l'analyse de l'échéance: {e}")
+        logger.error("Erreur lors de l'analyse de l'échéance: %s", e)
         # Retourner une analyse minimale en cas d'erreur
         return {
-            "deadline_info": deadline.dict(),
+            "deadline_info": deadline_info,
             "completion_probability": 0.5,
             "risk_factors": [{"factor": "Erreur d'analyse", "impact": "medium"}],
             "recommendations": ["Vérifier les données de l'échéance"]
         }
+    
+    # Analyser les risques
+    risks = analyze_deadline_risks(
+        deadline, historical_data, now, features, history_summary, risk_mask
+    )
+    
+    # Générer des recommandations
+    recommendations = generate_deadline_recommendations(
+        deadline, risks, now, features, risk_mask
+    )
+    
+    # Calculer des statistiques sur les données historiques, si disponibles
+    historical_stats = history_summary["stats"] if history_summary else None
+    
+    # Assembler les résultats
+    results = {
+        "deadline_info": deadline_info,
+        "features": asdict(features),
+        "completion_probability": probability,
+        "risk_factors": risks,
+        "recommendations": recommendations
+    }
+    
+    if historical_stats:
+        results["historical_stats"] = historical_stats
+    
+    return results
+
+def analyze_deadlines_batch(
+    deadlines: List[DeadlineInfo],
+    historical_data: Optional[List[DeadlineInfo]] = None,
+    now: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Analyse un lot d'échéances partageant les mêmes données historiques.
+    
+    L'historique n'est résumé qu'une fois pour l'ensemble du lot, et les
+    caractéristiques comme les probabilités sont calculées de façon vectorisée.
+    
+    Args:
+        deadlines: Les échéances à analyser
+        historical_data: Données historiques pour comparaison
+        now: Instant de référence (par défaut, l'heure courante)
+        
+    Returns:
+        Liste des résultats d'analyse, dans l'ordre des échéances
+    """
+    if not deadlines:
+        return []
+    
+    now = now or datetime.now(timezone.utc)
+    history_summary = summarize_history(historical_data, now)
+    
+    features_batch = extract_features_batch(deadlines, now)
+    probabilities = estimate_completion_probability_batch(features_batch, history_summary)
+    risk_masks = compute_risk_mask_batch(features_batch, history_summary)
+    
+    return [
+        analyze_deadline(
+            deadline, historical_data, now, history_summary,
+            features, float(probability), int(risk_mask)
+        )
+        for deadline, features, probability, risk_mask in zip(
+            deadlines, _feature_records(features_batch), probabilities, risk_masks
+        )
+    ]
 
 # Point d'entrée pour les tests
 if __name__ == "__main__":
     # Exemple d'utilisation
-    now = datetime.now()
+    now = datetime.now(timezone.utc)
     
     # Créer une échéance de test
     test_deadline = DeadlineInfo(
@@ -0,0 +1,109 @@
+"""
+Module d'extraction heuristique pour le service IA
+--------------------------------------------------
+Ce module fournit les fonctions qui extraient des données structurées
+(objet JSON, sections, listes) du texte libre produit par le modèle, lorsque
+sa réponse ne respecte pas le format demandé.
+
+Entièrement annoté, il peut être compilé en extension C avec mypyc
+(`mypyc heuristics.py`) ; la version compilée est alors importée à la
+place du fichier source, sans autre changement.
+"""
+
+import json
+import logging
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+# google-re2 est optionnel : moteur d'expressions régulières à temps linéaire,
+# sans retour arrière ; sans lui, les expressions sont compilées par re
+try:
+    import re2
+except ImportError:
+    re2 = None  # type: ignore[assignment]
+
+# Configuration du logging
+logger = logging.getLogger("heuristics")
+
+_JSON_DECODER = json.JSONDecoder()
+
+def extract_json_object(text: str) -> Optional[Any]:
+    """
+    Extrait le premier objet JSON valide d'un texte libre.
+
+    Le décodage part de la première accolade et s'arrête à la fin de l'objet,
+    sans dépendre de la dernière accolade du texte ; en cas d'échec, une
+    seconde tentative est faite à partir de l'accolade suivante.
+
+    Args:
+        text: Texte produit par le modèle
+
+    Returns:
+        Le dictionnaire décodé, ou None si aucun objet valide n'est trouvé
+    """
+    start = text.find("{")
+    for _ in range(2):
+        if start == -1:
+            break
+        try:
+            obj, _end = _JSON_DECODER.raw_decode(text, start)
+            return obj
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+    return None
+
+def compile_regex(pattern: str) -> Any:
+    """
+    Compile une expression avec re2 s'il est installé, sinon avec re.
+
+    Les expressions sont écrites dans la syntaxe commune aux deux moteurs
+    (options en ligne, "\\n?$" pour la fin de texte) ; celles que re2 refuse
+    sont compilées par re.
+
+    Args:
+        pattern: Expression régulière
+
+    Returns:
+        L'expression compilée
+    """
+    if re2 is not None:
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            logger.warning("Expression non prise en charge par re2, repli sur re: %s", pattern)
+    return re.compile(pattern)
+
+def compile_section_patterns(keywords: Sequence[str]) -> Tuple[Any, Any]:
+    """Compile les expressions qui repèrent une section introduite par des mots-clés"""
+    alternatives = "|".join(keywords)
+    return (
+        compile_regex(rf"(?is)({alternatives}).*?\n(.*?)(?:\n\n|\n[A-Z0-9]|\n?$)"),
+        compile_regex(rf"(?is)({alternatives}).*?:(.*?)(?:\n\n|\n[A-Z0-9]|\n?$)")
+    )
+
+# Expression compilée une seule fois, à l'import du module
+_LIST_ITEM_RE = compile_regex(r"(?:^|\n)[\s]*(?:\d+\.|-|\*|•)[\s]*(.*?)(?:\n|$)")
+
+def extract_section(text: str, patterns: Sequence[Any]) -> str:
+    """Extrait une section à l'aide d'expressions issues de compile_section_patterns"""
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            section: str = match.group(2)
+            return section.strip()
+    return ""
+
+def parse_list_items(text: str) -> List[str]:
+    """Parse les éléments d'une liste depuis un texte"""
+    # Essayer d'extraire des items numérotés ou avec puces
+    items: List[str] = _LIST_ITEM_RE.findall(text)
+
+    # Si aucun item n'est trouvé, diviser par lignes
+    if not items:
+        items = [line.strip() for line in text.split("\n") if line.strip()]
+
+    # S'il n'y a toujours rien, retourner le texte comme un seul élément
+    if not items:
+        items = [text]
+
+    return items
@@ -13,30 +13,48 @@ Le service utilise:
 
 # Import des bibliothèques standard
 import os
-import json
+import hashlib
 import logging
+import queue
 import asyncio
 import time
-from typing import List, Dict, Optional, Any, Union
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Dict, Optional, Any, Union, AsyncIterator, Literal, Tuple
 from datetime import datetime, timedelta, timezone
 
 # Import des bibliothèques externes
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, validator
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 import uvicorn
 import aiohttp
+import orjson
 
-# Configuration du logging
+# Import des modules du service
+from cache import ResponseCache
+from data_processing import DeadlineInfo, analyze_deadline, days_bucket, summarize_history
+from heuristics import compile_section_patterns, extract_json_object, extract_section, parse_list_items
+
+# Configuration du logging : les appels au logger ne font que déposer les
+# messages (déjà formatés) dans une file, écrite sur la console et dans le
+# fichier par le thread du QueueListener, hors de la boucle d'événements
+_log_queue = queue.Queue(-1)
+_log_listener = QueueListener(
+    _log_queue,
+    logging.StreamHandler(),
+    logging.FileHandler("ai_service.log")
+)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("ai_service.log")
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
+# Démarré avec l'installation du QueueHandler, et non au démarrage de l'application,
+# pour que les messages émis à l'import ou lors d'un démarrage avorté soient écrits
+_log_listener.start()
 logger = logging.getLogger("ai_service")
 
 # Définition des constantes
@@ -45,10 +63,96 @@ TEMPERATURE = float(os.environ.get("TEMPERATURE", "0.5"))
 MAX_CONTEXT_ITEMS = int(os.environ.get("MAX_CONTEXT_ITEMS", "10"))
 
 # Configuration Ollama
+# Les requêtes concurrentes sont regroupées par le serveur Ollama lui-même
+# (variable OLLAMA_NUM_PARALLEL du serveur, chaque slot réservant N_CTX tokens
+# de cache KV) : ce service envoie les requêtes en parallèle, dans la limite
+# de OLLAMA_CONCURRENCY par worker
 OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+# Le tag peut désigner une quantification précise, ex: "mistral:7b-instruct-q4_K_M"
+# ou "mistral:7b-instruct-q5_K_M" (le tag "mistral" par défaut est en Q4_0)
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "mistral")
 
-# Initialisation de l'application FastAPI
+# Taille de la fenêtre de contexte (prompt + réponse), qui dimensionne le cache KV.
+# Le prompt système, les échéances et jusqu'à MAX_CONTEXT_ITEMS messages doivent
+# y tenir avec les MAX_TOKENS de la réponse : au-delà, Ollama tronque le début
+# du prompt sans erreur
+N_CTX = int(os.environ.get("N_CTX", "2048"))
+
+# Budget de tokens du prompt (système, contexte et requête) : les messages de
+# contexte les plus anciens sont écartés pour que la réponse tienne dans N_CTX
+MAX_PROMPT_TOKENS = int(os.environ.get("MAX_PROMPT_TOKENS", str(N_CTX - MAX_TOKENS)))
+
+# Nombre de couches du modèle déchargées sur le GPU. Non défini, Ollama détecte
+# le GPU (CUDA, ROCm, Metal) et décharge automatiquement autant de couches que
+# la mémoire le permet ; une grande valeur (ex: 999) force le déchargement
+# complet, 0 force l'exécution sur CPU
+OLLAMA_NUM_GPU = os.environ.get("OLLAMA_NUM_GPU")
+
+# Nombre de threads de calcul d'Ollama pour l'inférence sur CPU. Non défini,
+# Ollama retient le nombre de cœurs physiques ; à réduire si ce service ou
+# d'autres processus partagent la machine
+OLLAMA_NUM_THREAD = os.environ.get("OLLAMA_NUM_THREAD")
+
+# Durée pendant laquelle Ollama garde le modèle chargé après une requête
+# (ex: "30m", ou -1 pour toujours). Tant que le modèle reste en mémoire, Ollama
+# réutilise le cache KV du préfixe commun avec la requête précédente (prompt
+# système et échéances) et ne recalcule que la fin du prompt.
+# Ollama lit une chaîne comme une durée Go ("30m", "-1m") et refuse une valeur
+# sans unité : un entier seul ("-1", "3600") est donc envoyé comme un nombre
+# (en secondes, -1 pour toujours), à l'image du OLLAMA_KEEP_ALIVE du serveur
+_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m").strip()
+OLLAMA_KEEP_ALIVE = int(_KEEP_ALIVE) if _KEEP_ALIVE.lstrip("-").isdigit() else _KEEP_ALIVE
+
+# Décharger le modèle de la mémoire d'Ollama (RAM/VRAM) à l'arrêt du service,
+# plutôt que d'attendre l'expiration de OLLAMA_KEEP_ALIVE
+OLLAMA_UNLOAD_ON_SHUTDOWN = os.environ.get("OLLAMA_UNLOAD_ON_SHUTDOWN", "false").lower() in ("1", "true", "yes")
+
+# Mode développement (DEV ou RELOAD) : un seul processus, rechargé à chaque
+# modification ; sinon le point d'entrée lance WORKERS processus
+DEV_MODE = any(
+    os.environ.get(name, "").lower() in ("1", "true", "yes")
+    for name in ("DEV", "RELOAD")
+)
+WORKERS = 1 if DEV_MODE else int(os.environ.get("WORKERS", "4"))
+
+# Capacité réelle d'Ollama : valeur de OLLAMA_NUM_PARALLEL du serveur
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+
+# Nombre maximal de générations envoyées simultanément à Ollama PAR PROCESSUS.
+# Par défaut OLLAMA_NUM_PARALLEL, ce qui convient à un processus unique
+# (uvicorn main:app, conteneur) ; avec N workers lancés par uvicorn --workers
+# ou gunicorn, définir OLLAMA_CONCURRENCY à OLLAMA_NUM_PARALLEL // N (le point
+# d'entrée de ce module le fait pour ses WORKERS). Les requêtes suivantes
+# attendent ici, au plus OLLAMA_QUEUE_TIMEOUT secondes avant un refus (429)
+OLLAMA_CONCURRENCY = int(os.environ.get("OLLAMA_CONCURRENCY", str(OLLAMA_NUM_PARALLEL)))
+OLLAMA_QUEUE_TIMEOUT = float(os.environ.get("OLLAMA_QUEUE_TIMEOUT", "30"))
+
+# Options d'inférence envoyées à Ollama, construites une fois au démarrage
+OLLAMA_OPTIONS = {
+    "temperature": TEMPERATURE,
+    "num_predict": MAX_TOKENS,
+    "num_ctx": N_CTX
+}
+if OLLAMA_NUM_GPU is not None:
+    OLLAMA_OPTIONS["num_gpu"] = int(OLLAMA_NUM_GPU)
+if OLLAMA_NUM_THREAD is not None:
+    OLLAMA_OPTIONS["num_thread"] = int(OLLAMA_NUM_THREAD)
+
+# Cache des réponses de /chat, pour les requêtes répétées à l'identique. Par
+# défaut ("auto"), il n'est actif qu'à basse température (<= 0.3) : au-delà,
+# l'utilisateur s'attend à des réponses variées. "true"/"false" le forcent
+RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "auto").lower()
+RESPONSE_CACHE_ENABLED = (
+    TEMPERATURE <= 0.3 if RESPONSE_CACHE == "auto"
+    else RESPONSE_CACHE in ("1", "true", "yes")
+)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL) if RESPONSE_CACHE_ENABLED else None
+
+# Initialisation de l'application FastAPI. Les réponses déclarant un
+# response_model sont sérialisées directement en JSON par Pydantic
+# (FastAPI >= 0.130), sans jsonable_encoder ni json.dumps
 app = FastAPI(
     title="Service IA pour la Gestion d'Échéances",
     description="API pour interagir avec un LLM via Ollama pour la gestion d'échéances",
@@ -68,30 +172,13 @@ app.add_middleware(
 
 class MessageItem(BaseModel):
     """Un message dans une conversation"""
-    role: str = Field(..., description="Le rôle de l'émetteur du message (user ou assistant)")
-    content: str = Field(..., description="Le contenu du message")
+    model_config = ConfigDict(frozen=True, extra="ignore")
     
-    @validator('role')
-    def validate_role(cls, v):
-        if v not in ["user", "assistant", "system"]:
-            raise ValueError("Le rôle doit être 'user', 'assistant' ou 'system'")
-        return v
-
-class DeadlineInfo(BaseModel):
-    """Information sur une échéance pour enrichir le contexte"""
-    id: Optional[str] = None
-    title: str
-    description: Optional[str] = None
-    deadlineDate: datetime
-    status: str
-    priority: str
-    projectId: Optional[str] = None
-    projectName: Optional[str] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    # Le Literal est validé par pydantic-core, sans validateur Python
+    role: Literal["user", "assistant", "system"] = Field(
+        ..., description="Le rôle de l'émetteur du message (user, assistant ou system)"
+    )
+    content: str = Field(..., description="Le contenu du message")
 
 class UserInfo(BaseModel):
     """Informations sur l'utilisateur"""
@@ -114,6 +201,9 @@ class PredictionRequest(BaseModel):
     historical_data: Optional[List[DeadlineInfo]] = None
     user_id: Optional[str] = None
     user_info: Optional[UserInfo] = None
+    include_recommendations: bool = Field(
+        False, description="Faire rédiger les recommandations par le modèle plutôt que par l'heuristique"
+    )
 
 class ChatResponse(BaseModel):
     """Réponse du chat"""
@@ -127,32 +217,208 @@ class PredictionResponse(BaseModel):
     recommendations: List[str] = Field(..., description="Recommandations pour améliorer les chances de complétion")
     processing_time: float = Field(..., description="Temps de traitement en secondes")
 
+# En-têtes des requêtes dont le corps est déjà sérialisé par orjson
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Session HTTP partagée vers Ollama
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Renvoie la session HTTP partagée par tous les appels à Ollama.
+    
+    La session (et son pool de connexions keep-alive) est créée au premier
+    appel puis conservée dans app.state jusqu'à l'arrêt du service, ce qui
+    évite d'ouvrir une nouvelle connexion TCP à chaque requête.
+    
+    Returns:
+        Session aiohttp ouverte
+    """
+    session = getattr(app.state, "http", None)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=32,
+                keepalive_timeout=75,
+                ttl_dns_cache=300
+            )
+        )
+        app.state.http = session
+    return session
+
 # Fonction pour vérifier si Ollama est disponible
-async def check_ollama_status():
-    """Vérifie si le service Ollama est disponible"""
+async def _fetch_ollama_status():
+    """Interroge Ollama sur les modèles disponibles"""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{OLLAMA_HOST}/api/tags") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    models = [model["name"] for model in data.get("models", [])]
-                    logger.info(f"Modèles Ollama disponibles: {models}")
-                    if OLLAMA_MODEL not in models:
-                        logger.warning(f"Le modèle {OLLAMA_MODEL} n'est pas disponible dans Ollama")
-                    return True, models
-                else:
-                    logger.error(f"Erreur lors de la vérification d'Ollama: {response.status}")
-                    return False, []
+        session = get_http_session()
+        async with session.get(f"{OLLAMA_HOST}/api/tags") as response:
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                models = [model["name"] for model in data.get("models", [])]
+                logger.info("Modèles Ollama disponibles: %s", models)
+                if OLLAMA_MODEL not in models:
+                    logger.warning("Le modèle %s n'est pas disponible dans Ollama", OLLAMA_MODEL)
+                return True, models
+            else:
+                logger.error("Erreur lors de la vérification d'Ollama: %s", response.status)
+                return False, []
     except Exception as e:
-        logger.error(f"Impossible de se connecter à Ollama: {e}")
+        logger.error("Impossible de se connecter à Ollama: %s", e)
         return False, []
 
+# Dernier état d'Ollama connu : (instant de la vérification, disponibilité, modèles)
+OLLAMA_STATUS_TTL = float(os.environ.get("OLLAMA_STATUS_TTL", "5"))
+_status_cache: Tuple[float, bool, List[str]] = (float("-inf"), False, [])
+_status_lock = asyncio.Lock()
+
+async def check_ollama_status():
+    """
+    Vérifie si le service Ollama est disponible.
+    
+    Le résultat est conservé OLLAMA_STATUS_TTL secondes : une rafale de sondes
+    /health ne déclenche qu'un appel à Ollama, les autres attendant le verrou
+    puis lisant le résultat mis en cache.
+    
+    Returns:
+        (disponibilité, liste des modèles)
+    """
+    global _status_cache
+    
+    checked_at, available, models = _status_cache
+    if time.monotonic() - checked_at < OLLAMA_STATUS_TTL:
+        return available, models
+    
+    async with _status_lock:
+        checked_at, available, models = _status_cache
+        if time.monotonic() - checked_at < OLLAMA_STATUS_TTL:
+            return available, models
+        
+        available, models = await _fetch_ollama_status()
+        _status_cache = (time.monotonic(), available, models)
+        return available, models
+
+# Symboles utilisés dans la liste des échéances du prompt
+_DONE_STATUSES = frozenset({"complétée", "terminée", "completed"})
+_PRIORITY_EMOJIS = {
+    "critique": "🔴",
+    "haute": "🟠",
+    "moyenne": "🟡",
+    "basse": "🟢"
+}
+
+# Formatage d'une date au format français
+def _fmt_fr(dt: datetime) -> str:
+    """Formate une date en JJ/MM/AAAA HH:MM, sans passer par strftime"""
+    return f"{dt.day:02d}/{dt.month:02d}/{dt.year} {dt.hour:02d}:{dt.minute:02d}"
+
+# Formatage d'une échéance pour le prompt
+@lru_cache(maxsize=1024)
+def format_deadline_entry(
+    title: str,
+    description: Optional[str],
+    deadline_date: datetime,
+    status: str,
+    priority: str,
+    project_name: Optional[str],
+    days_left: int
+) -> str:
+    """
+    Formate la description d'une échéance pour le prompt système.
+    
+    Le résultat est mis en cache : une échéance inchangée, au même nombre de
+    jours restants, n'est formatée qu'une fois d'une requête à l'autre.
+    
+    Args:
+        title: Titre de l'échéance
+        description: Description de l'échéance
+        deadline_date: Date de l'échéance
+        status: Statut de l'échéance
+        priority: Priorité de l'échéance
+        project_name: Nom du projet associé
+        days_left: Nombre de jours restants
+        
+    Returns:
+        Texte de l'échéance, sans son numéro
+    """
+    date_str = _fmt_fr(deadline_date)
+    status_emoji = "✅" if status.lower() in _DONE_STATUSES else "⏳"
+    priority_emoji = _PRIORITY_EMOJIS.get(priority.lower(), "⚪")
+    
+    project_info = f" (Projet: {project_name})" if project_name else ""
+    
+    entry = f"{status_emoji} {priority_emoji} '{title}'{project_info} - Échéance: {date_str} ({days_left} jours restants)"
+    if description:
+        entry += f"\n   Description: {description}"
+    return entry
+
+# Estimation de la taille d'un texte en tokens
+def approx_tokens(text: str) -> int:
+    """
+    Estime le nombre de tokens d'un texte, à raison d'environ 4 caractères par token.
+    
+    Args:
+        text: Texte à estimer
+        
+    Returns:
+        Nombre approximatif de tokens
+    """
+    return len(text) // 4 + 1
+
+# Prompt système fixe, envoyé en premier et identique d'une requête à l'autre :
+# Ollama réutilise ainsi le cache KV de ce préfixe
+STATIC_SYSTEM_PROMPT = """[Speak in french] Tu es un assistant IA spécialisé dans la gestion d'échéances. Tu aides les utilisateurs à gérer leurs échéances, projets et délais.
+Tu analyses les informations fournies et tu donnes des conseils pertinents, des analyses et des prédictions.
+Ton objectif est d'aider l'utilisateur à mieux organiser son travail, à respecter ses délais et à prioriser ses tâches.
+Tu dois toujours répondre en Français et être poli et professionnel.
+Ne fais pas de suppositions sur les informations que tu n'as pas reçues.
+Ne fais pas de remarques sur les informations que tu n'as pas reçues."""
+
+# Construction de la partie variable du prompt système
+@lru_cache(maxsize=128)
+def build_dynamic_system_prompt(
+    user_key: Optional[Tuple[str, str, str, Optional[str]]],
+    deadline_keys: Tuple[Tuple[Any, ...], ...]
+) -> str:
+    """
+    Construit le message système propre à la requête (utilisateur et échéances).
+    
+    Le résultat est mis en cache : une requête répétée avec le même utilisateur
+    et les mêmes échéances (au même nombre de jours restants) réutilise le
+    message déjà construit.
+    
+    Args:
+        user_key: (prénom, nom, rôle, département) de l'utilisateur, le cas échéant
+        deadline_keys: Arguments de format_deadline_entry pour chaque échéance
+        
+    Returns:
+        Contenu du message système, vide sans utilisateur ni échéance
+    """
+    parts = []
+
+    # Ajouter les informations utilisateur si disponibles
+    if user_key:
+        first_name, last_name, role, department = user_key
+        parts.append(f"Tu interagis avec {first_name} {last_name}, qui a le rôle de {role}")
+        if department:
+            parts.append(f" dans le département {department}")
+        parts.append(".")
+
+    # Ajouter les informations sur les échéances s'il y en a
+    if deadline_keys:
+        if parts:
+            parts.append("\n\n")
+        parts.append("Informations sur les échéances actuelles:")
+        for i, deadline_key in enumerate(deadline_keys, 1):
+            parts.append(f"\n{i}. {format_deadline_entry(*deadline_key)}")
+    
+    return "".join(parts)
+
 # Formatage du prompt pour le modèle
 def format_prompt_mistral(
     query: str, 
     context: List[MessageItem] = None, 
     deadlines: List[DeadlineInfo] = None,
-    user_info: UserInfo = None
+    user_info: UserInfo = None,
+    now: Optional[datetime] = None
 ) -> List[Dict[str, str]]:
     """
     Formate le prompt pour Mistral en incluant le contexte et les informations sur les échéances.
@@ -162,151 +428,454 @@ def format_prompt_mistral(
         context: Historique de conversation (messages précédents)
         deadlines: Liste des échéances à inclure dans le contexte
         user_info: Informations sur l'utilisateur
+        now: Instant de référence (par défaut, l'heure courante)
         
     Returns:
         Liste de messages au format attendu par Ollama
     """
-    # Construction du prompt système
-    system_prompt = """[Speak in french] Tu es un assistant IA spécialisé dans la gestion d'échéances. Tu aides les utilisateurs à gérer leurs échéances, projets et délais.
-Tu analyses les informations fournies et tu donnes des conseils pertinents, des analyses et des prédictions.
-Ton objectif est d'aider l'utilisateur à mieux organiser son travail, à respecter ses délais et à prioriser ses tâches.
-Tu dois toujours répondre en Français et être poli et professionnel.
-Ne fais pas de suppositions sur les informations que tu n'as pas reçues.
-Ne fais pas de remarques sur les informations que tu n'as pas reçues."""
-
-    # Ajouter les informations utilisateur si disponibles
+    # Clés du prompt système variable : les champs affichés, dont les jours restants
+    user_key = None
     if user_info:
-        system_prompt += f"\n\nTu interagis avec {user_info.firstName} {user_info.lastName}, qui a le rôle de {user_info.role}"
-        if user_info.department:
-            system_prompt += f" dans le département {user_info.department}"
-        system_prompt += "."
-
-    # Ajouter les informations sur les échéances au système s'il y en a
-    if deadlines and len(deadlines) > 0:
-        now = datetime.now(timezone.utc)
-        system_prompt += "\n\nInformations sur les échéances actuelles:"
-        for i, deadline in enumerate(deadlines, 1):
-            date_str = deadline.deadlineDate.strftime("%d/%m/%Y %H:%M")
-            days_left = (deadline.deadlineDate - now).days
-            status_emoji = "✅" if deadline.status.lower() in ["complétée", "terminée", "completed"] else "⏳"
-            priority_emoji = {
-                "critique": "🔴",
-                "haute": "🟠",
-                "moyenne": "🟡",
-                "basse": "🟢"
-            }.get(deadline.priority.lower(), "⚪")
-            
-            project_info = f" (Projet: {deadline.projectName})" if deadline.projectName else ""
-            
-            system_prompt += f"\n{i}. {status_emoji} {priority_emoji} '{deadline.title}'{project_info} - Échéance: {date_str} ({days_left} jours restants)"
-            if deadline.description:
-                system_prompt += f"\n   Description: {deadline.description}"
-
-    # Construction des messages pour Ollama
-    messages = []
+        user_key = (user_info.firstName, user_info.lastName, user_info.role, user_info.department)
+    
+    deadline_keys = ()
+    if deadlines:
+        # Un seul instant de référence pour toutes les échéances, arrondi au début
+        # de la journée pour que le prompt reste identique tout au long du jour
+        today = (now or datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Jours restants calculés une fois par date d'échéance distincte
+        days_left = {}
+        for deadline in deadlines:
+            if deadline.deadlineDate not in days_left:
+                days_left[deadline.deadlineDate] = (deadline.deadlineDate - today).days
+        
+        deadline_keys = tuple(
+            (
+                deadline.title,
+                deadline.description,
+                deadline.deadlineDate,
+                deadline.status,
+                deadline.priority,
+                deadline.projectName,
+                days_left[deadline.deadlineDate]
+            )
+            for deadline in deadlines
+        )
     
-    # Ajouter le message système
-    messages.append({"role": "system", "content": system_prompt})
+    dynamic_prompt = build_dynamic_system_prompt(user_key, deadline_keys)
+
+    # Construction des messages pour Ollama, en une passe : prompt système fixe,
+    # puis variable, contexte de la conversation, puis requête actuelle
+    messages = [{"role": "system", "content": STATIC_SYSTEM_PROMPT}]
+    if dynamic_prompt:
+        messages.append({"role": "system", "content": dynamic_prompt})
     
-    # Ajouter le contexte de la conversation
-    if context and len(context) > 0:
-        logger.info(f"Utilisation d'un contexte de conversation avec {len(context)} messages")
+    if context:
+        logger.info("Utilisation d'un contexte de conversation avec %s messages", len(context))
         
         # Limiter le contexte au nombre max d'éléments si nécessaire
-        limited_context = context[-MAX_CONTEXT_ITEMS:] if len(context) > MAX_CONTEXT_ITEMS else context
-        
-        # Si nous avons tronqué le contexte, on le log
         if len(context) > MAX_CONTEXT_ITEMS:
-            logger.info(f"Contexte tronqué de {len(context)} à {MAX_CONTEXT_ITEMS} messages")
+            logger.info("Contexte tronqué de %s à %s messages", len(context), MAX_CONTEXT_ITEMS)
+            context = context[-MAX_CONTEXT_ITEMS:]
         
-        # Ajouter chaque message du contexte
-        for msg in limited_context:
-            messages.append({"role": msg.role, "content": msg.content})
+        # Puis garder les messages les plus récents qui tiennent dans le budget de tokens
+        budget = (
+            MAX_PROMPT_TOKENS
+            - approx_tokens(STATIC_SYSTEM_PROMPT)
+            - approx_tokens(dynamic_prompt)
+            - approx_tokens(query)
+        )
+        kept = 0
+        for msg in reversed(context):
+            budget -= approx_tokens(msg.content)
+            if budget < 0:
+                break
+            kept += 1
+        if kept < len(context):
+            logger.info("%s messages de contexte écartés pour respecter le budget de %s tokens", len(context) - kept, MAX_PROMPT_TOKENS)
+            context = context[len(context) - kept:]
+        
+        messages.extend({"role": msg.role, "content": msg.content} for msg in context)
     else:
         logger.info("Aucun contexte de conversation fourni")
     
-    # Ajouter la requête actuelle
     messages.append({"role": "user", "content": query})
     
     return messages
 
+# Corps d'une requête /api/chat d'Ollama
+def build_chat_payload(
+    messages: List[Dict[str, str]],
+    stream: bool,
+    response_format: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Construit le corps d'une requête à l'endpoint /api/chat d'Ollama.
+    
+    Args:
+        messages: Liste de messages formatés {"role": "...", "content": "..."}
+        stream: Réponse en flux NDJSON (True) ou en un seul objet JSON (False)
+        response_format: Schéma JSON imposé à la réponse, le cas échéant
+        
+    Returns:
+        Corps de la requête
+    """
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": messages,
+        "options": OLLAMA_OPTIONS,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "stream": stream
+    }
+    if response_format is not None:
+        payload["format"] = response_format
+    return payload
+
+# Au-delà de ce nombre d'échéances, le prompt est construit dans un thread
+PROMPT_THREAD_THRESHOLD = int(os.environ.get("PROMPT_THREAD_THRESHOLD", "50"))
+
+async def build_chat_messages(request: "ChatRequest", now: datetime) -> List[Dict[str, str]]:
+    """
+    Construit les messages d'une requête de chat sans bloquer la boucle d'événements.
+    
+    Avec beaucoup d'échéances, format_prompt_mistral est déporté dans le pool de
+    threads par défaut ; en dessous du seuil, le coût du passage par un thread
+    dépasserait celui du formatage, qui reste exécuté directement.
+    
+    Args:
+        request: Requête de chat validée
+        now: Instant de référence de la requête
+        
+    Returns:
+        Liste de messages au format attendu par Ollama
+    """
+    if request.deadlines and len(request.deadlines) > PROMPT_THREAD_THRESHOLD:
+        return await asyncio.to_thread(
+            format_prompt_mistral,
+            request.query,
+            request.context,
+            request.deadlines,
+            request.user_info,
+            now
+        )
+    return format_prompt_mistral(
+        query=request.query,
+        context=request.context,
+        deadlines=request.deadlines,
+        user_info=request.user_info,
+        now=now
+    )
+
 # Fonction de génération asynchrone via Ollama API
-async def generate_response_ollama(messages) -> str:
+async def _generate_response_ollama(messages, response_format: Optional[Dict[str, Any]] = None) -> str:
     """
     Génère une réponse en utilisant l'API Ollama.
     
     Args:
         messages: Liste de messages formatés {"role": "...", "content": "..."}
+        response_format: Schéma JSON imposé à la réponse (échantillonnage
+            contraint par grammaire côté Ollama), le cas échéant
         
     Returns:
         Texte de la réponse générée
     """
     try:
         url = f"{OLLAMA_HOST}/api/chat"
-        payload = {
-            "model": OLLAMA_MODEL,
-            "messages": messages,
-            "options": {
-                "temperature": TEMPERATURE,
-                "num_predict": MAX_TOKENS
-            },
-            "stream": False  # Important: désactiver le streaming pour obtenir une réponse JSON complète
-        }
+        # Important: désactiver le streaming pour obtenir une réponse JSON complète
+        payload = build_chat_payload(messages, stream=False, response_format=response_format)
         
-        logger.info(f"Envoi de la requête à Ollama: {url}")
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    # Lire le contenu de la réponse comme texte puis parser en JSON
-                    response_text = await response.text()
-                    try:
-                        data = json.loads(response_text)
-                        return data["message"]["content"]
-                    except json.JSONDecodeError:
-                        # Si nous avons un format NDJSON (ligne par ligne), traiter chaque ligne
-                        logger.info("Réponse au format NDJSON détectée, traitement ligne par ligne")
-                        lines = response_text.strip().split('\n')
-                        if lines and len(lines) > 0:
-                            # Prendre la dernière ligne qui contient généralement la réponse complète
-                            try:
-                                last_data = json.loads(lines[-1])
-                                if "message" in last_data and "content" in last_data["message"]:
-                                    return last_data["message"]["content"]
-                            except:
-                                pass
+        logger.info("Envoi de la requête à Ollama: %s", url)
+        session = get_http_session()
+        async with session.post(url, data=orjson.dumps(payload), headers=_JSON_HEADERS) as response:
+            if response.status == 200:
+                # Lire le contenu de la réponse comme texte puis parser en JSON
+                response_text = await response.text()
+                try:
+                    data = orjson.loads(response_text)
+                    return data["message"]["content"]
+                except orjson.JSONDecodeError:
+                    # Si nous avons un format NDJSON (ligne par ligne), traiter chaque ligne
+                    logger.info("Réponse au format NDJSON détectée, traitement ligne par ligne")
+                    lines = response_text.strip().split('\n')
+                    if lines and len(lines) > 0:
+                        # Prendre la dernière ligne qui contient généralement la réponse complète
+                        try:
+                            last_data = orjson.loads(lines[-1])
+                            if "message" in last_data and "content" in last_data["message"]:
+                                return last_data["message"]["content"]
+                        except:
+                            pass
                         
-                        # Si tout échoue, renvoyer le texte brut
-                        logger.warning(f"Impossible de parser la réponse JSON, renvoi du texte brut")
-                        return response_text
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Erreur Ollama {response.status}: {error_text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_502_BAD_GATEWAY,
-                        detail=f"Erreur lors de la génération via Ollama: {error_text}"
-                    )
+                    # Si tout échoue, renvoyer le texte brut
+                    logger.warning("Impossible de parser la réponse JSON, renvoi du texte brut")
+                    return response_text
+            else:
+                error_text = await response.text()
+                logger.error("Erreur Ollama %s: %s", response.status, error_text)
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Erreur lors de la génération via Ollama: {error_text}"
+                )
     except aiohttp.ClientError as e:
-        logger.error(f"Erreur de connexion à Ollama: {e}")
+        logger.error("Erreur de connexion à Ollama: %s", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Impossible de se connecter à Ollama: {str(e)}"
         )
     except Exception as e:
-        logger.error(f"Erreur inattendue avec Ollama: {e}")
+        logger.error("Erreur inattendue avec Ollama: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur inattendue: {str(e)}"
         )
 
+# Accès limité à Ollama : générations en cours et requêtes en attente
+_llm_sem = asyncio.Semaphore(OLLAMA_CONCURRENCY)
+_llm_active = 0
+_llm_waiting = 0
+
+@asynccontextmanager
+async def ollama_slot():
+    """
+    Réserve l'une des OLLAMA_CONCURRENCY places de génération du processus.
+    
+    Raises:
+        HTTPException: 429, avec un en-tête Retry-After, si aucune place ne se
+            libère dans les OLLAMA_QUEUE_TIMEOUT secondes
+    """
+    global _llm_active, _llm_waiting
+    
+    _llm_waiting += 1
+    # L'acquisition est protégée de l'annulation par wait_for : avant Python 3.12,
+    # un permis accordé au moment même de l'expiration serait sinon perdu
+    acquire = asyncio.ensure_future(_llm_sem.acquire())
+    try:
+        await asyncio.wait_for(asyncio.shield(acquire), OLLAMA_QUEUE_TIMEOUT)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        if acquire.done() and not acquire.cancelled():
+            # Permis obtenu malgré l'expiration ou l'annulation : le rendre
+            _llm_sem.release()
+        else:
+            acquire.cancel()
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        logger.warning("Aucune place de génération libérée en %s secondes, requête refusée", OLLAMA_QUEUE_TIMEOUT)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de requêtes en cours vers le modèle, réessayez plus tard",
+            headers={"Retry-After": str(max(1, round(OLLAMA_QUEUE_TIMEOUT)))}
+        )
+    finally:
+        _llm_waiting -= 1
+    
+    _llm_active += 1
+    try:
+        yield
+    finally:
+        _llm_active -= 1
+        _llm_sem.release()
+
+async def _generate_response_limited(messages, response_format: Optional[Dict[str, Any]] = None) -> str:
+    """Génère une réponse via Ollama une fois une place de génération obtenue"""
+    async with ollama_slot():
+        return await _generate_response_ollama(messages, response_format)
+
+# Générations en cours, par empreinte des messages et du format imposé
+_inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+def _forget_inflight(key: str, task: "asyncio.Task[str]") -> None:
+    """Retire une génération terminée de la table des générations en cours"""
+    _inflight.pop(key, None)
+    # Marque l'éventuelle exception comme lue si plus aucun appelant n'attend
+    if not task.cancelled():
+        task.exception()
+
+async def generate_response_ollama(messages, response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Génère une réponse via l'API Ollama, en regroupant les requêtes identiques.
+    
+    Tant qu'une génération est en cours pour les mêmes messages (et le même
+    format), les appels suivants attendent son résultat au lieu de solliciter
+    Ollama à nouveau ; une erreur est transmise à tous les appelants.
+    
+    Args:
+        messages: Liste de messages formatés {"role": "...", "content": "..."}
+        response_format: Schéma JSON imposé à la réponse, le cas échéant
+        
+    Returns:
+        Texte de la réponse générée
+    """
+    key = hashlib.sha256(orjson.dumps([messages, response_format])).hexdigest()
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_generate_response_limited(messages, response_format))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _forget_inflight(key, done))
+    else:
+        logger.info("Génération identique déjà en cours, attente de son résultat")
+    
+    # shield : l'abandon d'un appelant n'interrompt pas la génération des autres
+    return await asyncio.shield(task)
+
+# Génération en flux via Ollama API
+async def stream_response_ollama(messages) -> AsyncIterator[str]:
+    """
+    Génère une réponse via l'API Ollama en renvoyant les fragments au fil de l'eau.
+    
+    Args:
+        messages: Liste de messages formatés {"role": "...", "content": "..."}
+        
+    Yields:
+        Fragments successifs du texte de la réponse
+    """
+    url = f"{OLLAMA_HOST}/api/chat"
+    # Ollama renvoie alors un objet JSON par ligne (NDJSON)
+    payload = build_chat_payload(messages, stream=True)
+    
+    logger.info("Envoi de la requête en flux à Ollama: %s", url)
+    session = get_http_session()
+    async with ollama_slot():
+        async with session.post(url, data=orjson.dumps(payload), headers=_JSON_HEADERS) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error("Erreur Ollama %s: %s", response.status, error_text)
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Erreur lors de la génération via Ollama: {error_text}"
+                )
+            
+            # Chaque ligne porte un fragment du message, la dernière a "done" à true
+            async for line in response.content:
+                if not line.strip():
+                    continue
+                data = orjson.loads(line)
+                content = data.get("message", {}).get("content")
+                if content:
+                    yield content
+                if data.get("done"):
+                    break
+
+# Libellés des paliers de jours restants de days_bucket (dépassée, < 1 jour,
+# < 3 jours, < 7 jours, au-delà), qui forment avec la priorité et le statut
+# le prompt, donc la clé du cache, des recommandations
+_DAYS_BUCKET_LABELS = (
+    "dont la date est déjà dépassée",
+    "à terminer dans moins d'un jour",
+    "à terminer dans 1 à 3 jours",
+    "à terminer dans 3 à 7 jours",
+    "à terminer dans plus d'une semaine"
+)
+
+# Schéma imposé à la réponse du modèle : Ollama (>= 0.5) le convertit en grammaire
+# et la génération s'arrête à la fin de l'objet, sans texte autour
+_RECOMMENDATIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": {
+            "type": "array",
+            "items": {"type": "string"}
+        }
+    },
+    "required": ["recommendations"]
+}
+
+# Expressions qui repèrent la section des recommandations dans une réponse libre
+_RECOMMENDATIONS_PATTERNS = compile_section_patterns(["recommandations", "suggestions"])
+
+# Recommandations du modèle déjà générées, sérialisées en JSON
+RECOMMENDATIONS_CACHE_SIZE = int(os.environ.get("RECOMMENDATIONS_CACHE_SIZE", "256"))
+recommendations_cache = ResponseCache(RECOMMENDATIONS_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+async def generate_recommendations_ollama(priority: str, status: str, days_bucket: int) -> List[str]:
+    """
+    Fait rédiger par le modèle des recommandations pour un type d'échéance.
+    
+    Les recommandations ne dépendent que de la priorité, du statut et du palier
+    de jours restants : elles sont mises en cache (LRU) sur le prompt qui en
+    découle, si bien que la plupart des demandes n'atteignent jamais Ollama.
+    
+    Args:
+        priority: Priorité de l'échéance
+        status: Statut de l'échéance
+        days_bucket: Palier de jours restants, issu de data_processing.days_bucket
+        
+    Returns:
+        Liste de recommandations
+    """
+    query = f"""Donne entre 3 et 5 recommandations concrètes pour augmenter les chances de compléter dans les délais une échéance de priorité {priority}, au statut "{status}", {_DAYS_BUCKET_LABELS[days_bucket]}.
+
+Réponds au format JSON avec un unique champ "recommendations" contenant la liste des recommandations.
+"""
+    messages = [
+        {"role": "system", "content": "Tu es un assistant spécialisé dans l'analyse prédictive d'échéances"},
+        {"role": "user", "content": query}
+    ]
+    cached = recommendations_cache.get(messages)
+    if cached is not None:
+        return orjson.loads(cached)
+    
+    response_text = await generate_response_ollama(messages, _RECOMMENDATIONS_SCHEMA)
+    
+    # Extraire les recommandations du JSON, sinon de la liste rédigée par le modèle
+    # (versions d'Ollama ignorant le schéma)
+    prediction_data = extract_json_object(response_text)
+    recommendations = prediction_data.get("recommendations") if prediction_data else None
+    if isinstance(recommendations, str):
+        recommendations = [recommendations]
+    if not isinstance(recommendations, list) or not recommendations:
+        logger.warning("Impossible de parser le JSON du modèle, extraction heuristique des recommandations")
+        recommendations = parse_list_items(
+            extract_section(response_text, _RECOMMENDATIONS_PATTERNS) or response_text
+        )
+    
+    recommendations_cache.set(messages, orjson.dumps(recommendations).decode())
+    
+    return recommendations
+
 # Vérification de l'état d'Ollama au démarrage
 @app.on_event("startup")
 async def startup_event():
     """Vérification de l'état d'Ollama au démarrage"""
+    get_http_session()
+    
     ollama_available, models = await check_ollama_status()
     if not ollama_available:
         logger.warning("Ollama n'est pas disponible. Le service fonctionnera en mode dégradé.")
     else:
-        logger.info(f"Ollama est disponible avec les modèles: {models}")
+        logger.info("Ollama est disponible avec les modèles: %s", models)
+
+# Libération du modèle
+async def unload_ollama_model():
+    """Décharge immédiatement le modèle de la mémoire d'Ollama"""
+    # Une requête sans prompt avec keep_alive à 0 décharge immédiatement le modèle
+    try:
+        session = get_http_session()
+        async with session.post(
+            f"{OLLAMA_HOST}/api/generate",
+            data=orjson.dumps({"model": OLLAMA_MODEL, "keep_alive": 0}),
+            headers=_JSON_HEADERS
+        ) as response:
+            if response.status == 200:
+                logger.info("Modèle %s déchargé d'Ollama", OLLAMA_MODEL)
+            else:
+                logger.warning("Échec du déchargement du modèle %s: %s", OLLAMA_MODEL, response.status)
+    except aiohttp.ClientError as e:
+        logger.warning("Impossible de décharger le modèle d'Ollama: %s", e)
+
+# Arrêt du service
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Décharge le modèle si demandé, ferme la session HTTP puis vide la file des logs"""
+    if OLLAMA_UNLOAD_ON_SHUTDOWN:
+        await unload_ollama_model()
+    
+    session = getattr(app.state, "http", None)
+    if session is not None:
+        await session.close()
+    
+    # Écrit les derniers messages en attente et arrête le thread d'écriture
+    _log_listener.stop()
 
 # Endpoint pour le healthcheck
 @app.get("/health")
@@ -320,7 +889,15 @@ async def health_check():
             "available": ollama_available,
             "models": models,
             "selected_model": OLLAMA_MODEL,
-            "host": OLLAMA_HOST
+            "host": OLLAMA_HOST,
+            # Compteurs du seul processus ayant répondu, s'il y a plusieurs workers
+            "queue": {
+                "scope": "worker",
+                "pid": os.getpid(),
+                "active": _llm_active,
+                "waiting": _llm_waiting,
+                "concurrency": OLLAMA_CONCURRENCY
+            }
         },
         "version": "1.0.0"
     }
@@ -338,26 +915,28 @@ async def chat(request: ChatRequest):
     - user_info: Informations sur l'utilisateur
     """
     start_time = time.time()
+    now = datetime.now(timezone.utc)
     
     try:
         # Log du nombre de messages de contexte reçus
         context_count = len(request.context) if request.context else 0
-        logger.info(f"Requête chat reçue avec {context_count} messages de contexte")
+        logger.info("Requête chat reçue avec %s messages de contexte", context_count)
         
         # Formater les messages pour Ollama
-        messages = format_prompt_mistral(
-            query=request.query,
-            context=request.context,
-            deadlines=request.deadlines,
-            user_info=request.user_info
-        )
+        messages = await build_chat_messages(request, now)
         
-        # Générer la réponse via Ollama
-        response_text = await generate_response_ollama(messages)
+        # Réponse déjà générée pour les mêmes messages, sinon génération via Ollama
+        response_text = response_cache.get(messages) if response_cache is not None else None
+        if response_text is not None:
+            logger.info("Réponse servie depuis le cache")
+        else:
+            response_text = await generate_response_ollama(messages)
+            if response_cache is not None:
+                response_cache.set(messages, response_text)
         
         # Calculer le temps de traitement
         processing_time = time.time() - start_time
-        logger.info(f"Réponse générée en {processing_time:.2f} secondes")
+        logger.info("Réponse générée en %.2f secondes", processing_time)
         
         return ChatResponse(
             response=response_text,
@@ -365,156 +944,113 @@ async def chat(request: ChatRequest):
         )
     
     except Exception as e:
-        logger.error(f"Erreur lors de la génération de réponse: {e}")
+        logger.error("Erreur lors de la génération de réponse: %s", e)
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=f"Erreur lors de la génération de réponse: {str(e)}")
 
+# Endpoint pour le chat en flux
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Variante de /chat qui transmet la réponse au fil de la génération.
+    
+    La réponse est un flux Server-Sent Events : un événement par fragment de
+    texte ({"content": "..."}), puis un événement "done" portant le temps de
+    traitement, ou un événement "error" en cas d'échec. Une réponse déjà en
+    cache est transmise en un seul fragment ; une réponse générée en entier
+    est mise en cache comme pour /chat.
+    """
+    start_time = time.time()
+    now = datetime.now(timezone.utc)
+    
+    context_count = len(request.context) if request.context else 0
+    logger.info("Requête chat en flux reçue avec %s messages de contexte", context_count)
+    
+    # Formater les messages pour Ollama
+    messages = await build_chat_messages(request, now)
+    
+    async def event_stream():
+        try:
+            cached = response_cache.get(messages) if response_cache is not None else None
+            if cached is not None:
+                logger.info("Réponse servie depuis le cache")
+                yield f"data: {orjson.dumps({'content': cached}).decode()}\n\n"
+            else:
+                # Les fragments sont accumulés pour mettre la réponse complète en cache
+                chunks = []
+                async for chunk in stream_response_ollama(messages):
+                    chunks.append(chunk)
+                    yield f"data: {orjson.dumps({'content': chunk}).decode()}\n\n"
+                if response_cache is not None:
+                    response_cache.set(messages, "".join(chunks))
+            
+            processing_time = time.time() - start_time
+            logger.info("Réponse en flux générée en %.2f secondes", processing_time)
+            yield f"event: done\ndata: {orjson.dumps({'processing_time': processing_time}).decode()}\n\n"
+        
+        except Exception as e:
+            # Les en-têtes sont déjà envoyés : l'erreur est transmise dans le flux
+            logger.error("Erreur lors de la génération de réponse en flux: %s", e)
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield f"event: error\ndata: {orjson.dumps({'detail': detail}).decode()}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 # Endpoint pour les prédictions
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(request: PredictionRequest):
     """
     Endpoint pour l'analyse prédictive des échéances.
     
-    Utilise le modèle pour prédire la probabilité de complétion d'une échéance
-    et fournir des recommandations.
+    La probabilité de complétion, les facteurs de risque et les recommandations
+    sont calculés par le modèle heuristique de data_processing, en quelques
+    microsecondes et sans appel au LLM. Avec include_recommendations, les
+    recommandations sont rédigées par le modèle.
     """
     start_time = time.time()
     now = datetime.now(timezone.utc)
     
     try:
-        # Formater la demande pour le modèle
-        date_str = request.deadline_data.deadlineDate.strftime("%d/%m/%Y %H:%M")
-        days_left = (request.deadline_data.deadlineDate - now).days
-        
-        # Personnalisation selon l'utilisateur
-        user_greeting = ""
-        if request.user_info:
-            user_greeting = f"Analyse pour {request.user_info.firstName} {request.user_info.lastName} ({request.user_info.role}): "
+        deadline = request.deadline_data
         
-        query = f"""{user_greeting}Analyse cette échéance et prédit sa probabilité de complétion dans les délais.
+        # Analyse heuristique, l'historique n'étant résumé qu'une fois
+        history_summary = summarize_history(request.historical_data, now, with_stats=False)
+        analysis = analyze_deadline(deadline, request.historical_data, now, history_summary)
+        recommendations = analysis["recommendations"]
         
-Échéance: {request.deadline_data.title}
-Description: {request.deadline_data.description or 'Non spécifiée'}
-Date d'échéance: {date_str} (dans {days_left} jours)
-Priorité: {request.deadline_data.priority}
-Statut: {request.deadline_data.status}
-
-Basé sur ces informations:
-1. Quelle est la probabilité (entre 0 et 1) que cette échéance soit complétée à temps?
-2. Quels sont les facteurs de risque?
-3. Quelles recommandations donnerais-tu pour augmenter les chances de complétion?
-
-Réponds au format JSON avec les champs "completion_probability", "risk_factors" et "recommendations".
-"""
-        
-        # Générer la réponse
-        messages = [
-            {"role": "system", "content": "Tu es un assistant spécialisé dans l'analyse prédictive d'échéances"},
-            {"role": "user", "content": query}
-        ]
-        response_text = await generate_response_ollama(messages)
-        
-        # Extraire les informations de la réponse (recherche d'un JSON valide)
-        json_start = response_text.find("{")
-        json_end = response_text.rfind("}")
-        
-        if json_start != -1 and json_end != -1:
-            json_str = response_text[json_start:json_end+1]
+        # Recommandations rédigées par le modèle, sur demande uniquement
+        if request.include_recommendations:
+            # Jours restants déjà calculés par l'analyse, sauf si elle a échoué
+            if "features" in analysis:
+                days_left = analysis["features"]["days_until_deadline"]
+            else:
+                days_left = (deadline.deadlineDate - now).total_seconds() / 86400
             try:
-                prediction_data = json.loads(json_str)
-                
-                # Valider et normaliser les données
-                completion_probability = float(prediction_data.get("completion_probability", 0.5))
-                # Limiter entre 0 et 1
-                completion_probability = max(0, min(1, completion_probability))
-                
-                risk_factors = prediction_data.get("risk_factors", [])
-                if isinstance(risk_factors, str):
-                    risk_factors = [{"factor": risk_factors, "impact": "medium"}]
-                elif isinstance(risk_factors, list) and all(isinstance(rf, str) for rf in risk_factors):
-                    risk_factors = [{"factor": rf, "impact": "medium"} for rf in risk_factors]
-                
-                recommendations = prediction_data.get("recommendations", [])
-                if isinstance(recommendations, str):
-                    recommendations = [recommendations]
-                
-                # Calculer le temps de traitement
-                processing_time = time.time() - start_time
-                
-                return PredictionResponse(
-                    completion_probability=completion_probability,
-                    risk_factors=risk_factors,
-                    recommendations=recommendations,
-                    processing_time=processing_time
+                recommendations = await generate_recommendations_ollama(
+                    deadline.priority,
+                    deadline.status,
+                    days_bucket(days_left)
                 )
-            
-            except json.JSONDecodeError:
-                # Fallback si le JSON n'est pas valide
-                logger.warning("Impossible de parser le JSON du modèle, utilisation d'une analyse heuristique")
-        
-        # Fallback : analyse heuristique si le JSON n'est pas valide ou n'est pas présent
-        # Extraire probabilité avec une regex basique
-        import re
-        prob_match = re.search(r"probabilité.*?(\d+(?:\.\d+)?)", response_text, re.IGNORECASE)
-        probability = float(prob_match.group(1))/100 if prob_match else 0.5
-        
-        # Extraire risques et recommandations par des heuristiques simples
-        factors_section = extract_section(response_text, ["facteurs", "risques"])
-        factors = parse_list_items(factors_section) if factors_section else ["Délai serré"]
-        
-        recommendations_section = extract_section(response_text, ["recommandations", "suggestions"])
-        recommendations = parse_list_items(recommendations_section) if recommendations_section else ["Planifier les étapes"]
-        
-        risk_factors = [{"factor": factor, "impact": "medium"} for factor in factors]
+            except HTTPException as e:
+                logger.warning("Recommandations du modèle indisponibles, recommandations heuristiques conservées: %s", e.detail)
         
         # Calculer le temps de traitement
         processing_time = time.time() - start_time
         
         return PredictionResponse(
-            completion_probability=probability,
-            risk_factors=risk_factors,
+            completion_probability=analysis["completion_probability"],
+            risk_factors=analysis["risk_factors"],
             recommendations=recommendations,
             processing_time=processing_time
         )
     
     except Exception as e:
-        logger.error(f"Erreur lors de la prédiction: {e}")
+        logger.error("Erreur lors de la prédiction: %s", e)
         if isinstance(e, HTTPException):
             raise e
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction: {str(e)}")
 
-# Fonctions utilitaires pour le fallback
-def extract_section(text, keywords):
-    """Extrait une section basée sur des mots-clés"""
-    import re
-    patterns = [
-        rf"({'|'.join(keywords)}).*?\n(.*?)(?:\n\n|\n[A-Z0-9]|$)",
-        rf"({'|'.join(keywords)}).*?:(.*?)(?:\n\n|\n[A-Z0-9]|$)"
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if match:
-            return match.group(2).strip()
-    return ""
-
-def parse_list_items(text):
-    """Parse les éléments d'une liste depuis un texte"""
-    import re
-    # Essayer d'extraire des items numérotés ou avec puces
-    items = re.findall(r"(?:^|\n)[\s]*(?:\d+\.|-|\*|\•)[\s]*(.*?)(?:\n|$)", text)
-    
-    # Si aucun item n'est trouvé, diviser par lignes
-    if not items:
-        items = [line.strip() for line in text.split("\n") if line.strip()]
-    
-    # S'il n'y a toujours rien, retourner le texte comme un seul élément
-    if not items:
-        items = [text]
-    
-    return items
-
 # Endpoint pour tester directement Ollama
 @app.post("/test_ollama")
 async def test_ollama(prompt: str = "Comment améliorer la gestion d'échéances?"):
@@ -530,10 +1066,28 @@ async def test_ollama(prompt: str = "Comment améliorer la gestion d'échéances
 
 # Point d'entrée
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
\ No newline at end of file
+    if DEV_MODE:
+        # Développement : un seul processus, rechargé à chaque modification
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        # Production : plusieurs processus, chacun avec ses propres caches
+        # (réponses, recommandations, état d'Ollama). Chaque worker réimporte
+        # ce module : la capacité d'Ollama leur est répartie par l'environnement
+        os.environ.setdefault("OLLAMA_CONCURRENCY", str(max(1, OLLAMA_NUM_PARALLEL // WORKERS)))
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            # "auto" retient uvloop et httptools lorsqu'ils sont installés
+            # (uvloop n'existe pas sous Windows : repli sur asyncio / h11)
+            loop="auto",
+            http="auto",
+            workers=WORKERS,
+            log_level="info"
+        )
\ No newline at end of file
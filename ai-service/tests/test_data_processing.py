@@ -0,0 +1,151 @@
+"""
+Tests d'équivalence des implémentations du modèle heuristique
+-------------------------------------------------------------
+La probabilité de complétion existe en trois versions (scalaire, NumPy et
+Numba) et le masque de risque en deux (scalaire et par lot) : ces tests
+vérifient qu'elles donnent le même résultat, y compris aux bornes des
+paliers de temps restant.
+
+Lancement depuis ai-service : python -m unittest discover tests
+"""
+
+import itertools
+import unittest
+from dataclasses import astuple
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import numpy as np
+
+import data_processing as dp
+
+# Jours restants aux bornes de chaque palier, de part et d'autre du seuil
+_BOUNDARY_DAYS = sorted(
+    {value for threshold in dp._DAYS_THRESHOLDS
+     for value in (np.nextafter(threshold, -np.inf), threshold, np.nextafter(threshold, np.inf))}
+    | {-30.0, 0.5, 2.0, 5.0, 30.0}
+)
+_PRIORITY_VALUES = sorted(set(dp._PRIO_LUT.values()) | {2})
+_STATUS_PROGRESS = sorted(set(dp._STATUS_LUT.values()))
+_HOURS = (0, 8, 9, 12, 17, 18, 23)
+
+# Colonnes de extract_features_batch, avec leurs types NumPy
+_COLUMN_DTYPES = {
+    "days_until_deadline": np.float64,
+    "is_overdue": np.int64,
+    "priority_value": np.int8,
+    "status_progress": np.float64,
+    "has_description": np.int64,
+    "title_word_count": np.int64,
+    "is_weekend_deadline": np.int64,
+    "hour_of_deadline": np.int64,
+}
+
+def _all_features():
+    """Produit toutes les combinaisons de caractéristiques significatives"""
+    return [
+        dp.Features(
+            days_until_deadline=float(days),
+            is_overdue=int(days < 0),
+            priority_value=priority,
+            status_progress=status,
+            has_description=0,
+            title_word_count=2,
+            is_weekend_deadline=weekend,
+            hour_of_deadline=hour,
+        )
+        for days, priority, status, weekend, hour in itertools.product(
+            _BOUNDARY_DAYS, _PRIORITY_VALUES, _STATUS_PROGRESS, (0, 1), _HOURS
+        )
+    ]
+
+def _to_columns(features):
+    """Convertit des Features en colonnes, comme extract_features_batch"""
+    rows = list(zip(*(astuple(f) for f in features)))
+    return {
+        name: np.array(values, dtype=_COLUMN_DTYPES[name])
+        for name, values in zip(dp._FEATURE_NAMES, rows)
+    }
+
+def _history(now, completed, missed):
+    """Construit un historique de complétions et d'échecs répartis sur les priorités"""
+    priorities = ("critique", "haute", "moyenne", "basse")
+    return [
+        dp.DeadlineInfo(
+            title="historique",
+            deadlineDate=now - timedelta(days=i + 1),
+            status="complétée" if i < completed else "en cours",
+            priority=priorities[i % len(priorities)],
+        )
+        for i in range(completed + missed)
+    ]
+
+class HeuristicEquivalenceTest(unittest.TestCase):
+    """Compare les implémentations scalaires et par lot du modèle heuristique"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.now = datetime(2026, 10, 14, 12, 0, tzinfo=timezone.utc)
+        cls.features = _all_features()
+        cls.columns = _to_columns(cls.features)
+        cls.summaries = [None] + [
+            dp.summarize_history(_history(cls.now, completed, missed), cls.now, with_stats=False)
+            for completed, missed in ((2, 0), (1, 2), (20, 3), (7, 13), (17, 33))
+        ]
+
+    def _assert_probabilities(self, batch, history_summary):
+        for features, probability in zip(self.features, batch):
+            expected = dp.estimate_completion_probability(
+                None, features=features, history_summary=history_summary
+            )
+            self.assertAlmostEqual(float(probability), expected, places=12, msg=features)
+
+    def test_probability_numpy_matches_scalar(self):
+        with mock.patch.object(dp, "_get_probability_ufunc", return_value=None):
+            for history_summary in self.summaries:
+                batch = dp.estimate_completion_probability_batch(self.columns, history_summary)
+                self._assert_probabilities(batch, history_summary)
+
+    def test_probability_numba_matches_scalar(self):
+        if dp._get_probability_ufunc() is None:
+            self.skipTest("Numba n'est pas installé")
+        for history_summary in self.summaries:
+            batch = dp.estimate_completion_probability_batch(self.columns, history_summary)
+            self._assert_probabilities(batch, history_summary)
+
+    def test_risk_mask_batch_matches_scalar(self):
+        for history_summary in self.summaries:
+            batch = dp.compute_risk_mask_batch(self.columns, history_summary)
+            for features, mask in zip(self.features, batch):
+                self.assertEqual(int(mask), dp.compute_risk_mask(features, history_summary), features)
+
+    def test_analyze_batch_matches_scalar(self):
+        # Échéances exactement aux seuils des paliers, et à une microseconde près
+        offsets = [
+            timedelta(days=threshold) + timedelta(microseconds=delta)
+            for threshold in dp._DAYS_THRESHOLDS for delta in (-1, 0, 1)
+        ]
+        statuses = ("nouvelle", "en cours", "en attente", "complétée", "annulée", "en pause")
+        priorities = ("critique", "haute", "moyenne", "basse", "high")
+        deadlines = [
+            dp.DeadlineInfo(
+                title="échéance de test",
+                deadlineDate=self.now + offset,
+                status=status,
+                priority=priority,
+            )
+            for offset, status, priority in itertools.product(offsets, statuses, priorities)
+        ]
+        historical_data = _history(self.now, 7, 13)
+
+        batch = dp.analyze_deadlines_batch(deadlines, historical_data, self.now)
+        for deadline, result in zip(deadlines, batch):
+            expected = dp.analyze_deadline(deadline, historical_data, self.now)
+            self.assertAlmostEqual(
+                result["completion_probability"], expected["completion_probability"], places=12
+            )
+            self.assertEqual(result["risk_factors"], expected["risk_factors"])
+            self.assertEqual(result["recommendations"], expected["recommendations"])
+
+if __name__ == "__main__":
+    unittest.main()